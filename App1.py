@@ -1,14 +1,57 @@
-import json
+import functools
+import html
+import logging
+import os
 import random
-from collections import defaultdict
+import tempfile
 import streamlit as st
 import streamlit.components.v1 as components
+import radix_cards
+import radix_client
+import radix_engine
+import radix_export
+import radix_metrics
 
 # Set page configuration
 st.set_page_config(layout="wide")
 
-# Global IDC characters
-IDC_CHARS = {'⿰', '⿱', '⿲', '⿳', '⿴', '⿵', '⿶', '⿷', '⿸', '⿹', '⿺', '⿻'}
+# Output types; the N-Character modes show each result's own compounds of length N
+DISPLAY_MODES = ["Single Character", "2-Character Phrases", "3-Character Phrases", "4-Character Phrases", "Phrases Containing It"]
+
+# Containment views beside "all" (every depth the map covers) and the depth limits 1, 2, ...
+GROUPED_BY_DEPTH = "grouped"
+
+# Widgets in render_output_controls and render_pagination, which some runs leave out
+OUTPUT_KEYS = ("selected_idc", "output_radical", "display_mode", "containment")
+PAGINATION_KEYS = ("results_per_page", "result_order")
+
+# What the Export expander can write: the page shown, every result, or every character
+EXPORT_SCOPES = ["Current page", "All results", "Full dataset"]
+
+# RADIX_CLIENT_RESULTS=1 filters, orders and pages results in the browser
+# (client_component/) instead of rerunning the app for every click
+CLIENT_RESULTS = os.environ.get("RADIX_CLIENT_RESULTS", "") == "1"
+client_results = components.declare_component("radix_results", path=radix_client.FRONTEND_DIR)
+
+# Load-time data-quality warnings listed in the Debug expander before truncating
+DIAGNOSTICS_SHOWN = 100
+
+# Labels for the IDC filter options
+IDC_DESCRIPTIONS = {
+    "No Filter": "No Filter",
+    "⿰": "Left Right",
+    "⿱": "Top sovereigntyottom",
+    "⿲": "Left Middle Right",
+    "⿳": "Top Middle Bottom",
+    "⿴": "Surround",
+    "⿵": "Surround Top",
+    "⿶": "Surround Bottom",
+    "⿷": "Surround Left",
+    "⿸": "Top Left Corner",
+    "⿹": "Top Right Corner",
+    "⿺": "Bottom Left Corner",
+    "⿻": "Overlaid"
+}
 
 # Dynamic CSS function
 def apply_dynamic_css():
@@ -117,114 +160,215 @@ def init_session_state():
         "text_input_comp": selected_config["selected_comp"],
         "page": 1,
         "results_per_page": 50,
+        "result_order": "strokes",
+        "containment": "all",
         "previous_selected_comp": selected_config["selected_comp"],
         "debug_info": "",
-        "diagnostic_messages": [],
-        "font_scale": 1.0
+        "diagnostic_messages": radix_engine.DiagnosticLog(),
+        "font_scale": 1.0,
+        "short_labels": False,
+        "also_contains": "",
+        "contains_any": "",
+        "excludes": "",
+        "structure_pattern": "",
+        "text_matches": [],
+        "export_scope": "All results",
+        "export_format": "CSV",
+        "export_file": None
     }
     for key, value in defaults.items():
         st.session_state.setdefault(key, value)
 
 init_session_state()
-
-@st.cache_data
-def load_char_decomp():
+timer = radix_metrics.start_rerun()
+# True while the whole script runs; False during a rerun_region rerun
+full_run = True
+
+@st.cache_resource
+def start_metrics_export():
+    # On-disk cache hits and misses are always logged; RADIX_METRICS_LOG adds
+    # one JSON line per rerun and RADIX_METRICS_PORT serves /metrics
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    loggers = [logging.getLogger("radix.cache")]
+    if os.environ.get("RADIX_METRICS_LOG"):
+        loggers.append(radix_metrics.logger)
+    for logger in loggers:
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    port = os.environ.get("RADIX_METRICS_PORT")
+    if port:
+        return radix_metrics.serve_metrics(int(port), os.environ.get("RADIX_METRICS_HOST", "127.0.0.1"))
+    return None
+
+start_metrics_export()
+
+@st.cache_resource
+def load_explorer(max_depth=5):
+    radix_metrics.note_cache_miss("data_load")
     try:
-        with open("strokes1.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-            # Clean decompositions by removing '?' and logging warnings
-            for entry in data:
-                if '?' in entry.get("decomposition", ""):
-                    char = entry["character"]
-                    st.session_state.diagnostic_messages.append({
-                        "type": "warning",
-                        "message": f"Invalid component '?' in decomposition for {char}: {entry['decomposition']}"
-                    })
-                    entry["decomposition"] = ""
-            return {entry["character"]: entry for entry in data}
+        # RADIX_BUILD_WORKERS > 1 builds the component map in a process pool; 0 uses every CPU
+        workers = int(os.environ.get("RADIX_BUILD_WORKERS", "1"))
+        explorer = radix_engine.Explorer.load("strokes1.json", max_depth, workers=workers or None)
     except Exception as e:
         error_msg = f"Failed to load strokes1.json: {e}"
         st.error(error_msg)
-        st.session_state.diagnostic_messages.append({"type": "error", "message": error_msg})
-        return {}
-
-char_decomp = load_char_decomp()
-
-def is_valid_char(c):
-    return ('一' <= c <= '鿿' or '⺀' <= c <= '⻿' or '㐀' <= c <= '䶿' or '𠀀' <= c <= '𪛟')
-
-def get_stroke_count(char):
-    return char_decomp.get(char, {}).get("strokes", -1)
-
-def clean_field(field):
-    return field[0] if isinstance(field, list) and field else field or "—"
-
-def get_etymology_text(entry):
-    etymology = entry.get("etymology", {})
-    hint = clean_field(etymology.get("hint", "No hint available"))
-    details = clean_field(etymology.get("details", ""))
-    return f"{hint}{'; Details: ' + details if details and details != '—' else ''}"
-
-def format_decomposition(char):
-    """Format the decomposition to show full structure, ignoring invalid components."""
-    decomposition = char_decomp.get(char, {}).get("decomposition", "")
-    if not decomposition or '?' in decomposition:
-        return "—"
-    if decomposition[0] not in IDC_CHARS:
-        return decomposition
-    return decomposition
-
-def get_all_components(char, max_depth, depth=0, seen=None):
-    if seen is None:
-        seen = set()
-    if char in seen or depth > max_depth or not is_valid_char(char):
-        return set()
-    seen.add(char)
-    components = set()
-    decomposition = char_decomp.get(char, {}).get("decomposition", "")
-    if decomposition:
-        for comp in decomposition:
-            if comp in IDC_CHARS or comp == '?' or not is_valid_char(comp):
-                continue
-            components.add(comp)
-            components.update(get_all_components(comp, max_depth, depth + 1, seen.copy()))
-    return components
-
-@st.cache_data
-def build_component_map(max_depth=5):
-    component_map = defaultdict(list)
-    for char in char_decomp:
-        components = {char}
-        decomposition = char_decomp.get(char, {}).get("decomposition", "")
-        if decomposition and '?' not in decomposition:
-            for comp in decomposition:
-                if is_valid_char(comp) and comp != '?':
-                    components.add(comp)
-                    components.update(get_all_components(comp, max_depth))
-        for comp in components:
-            component_map[comp].append(char)
-    return component_map
+        return radix_engine.Explorer({}, max_depth=max_depth, diagnostics=[{"type": "error", "message": error_msg}])
+    return explorer
+
+@st.cache_resource
+def start_reload_watcher():
+    # Picks up edits to strokes1.json in the background; RADIX_RELOAD_INTERVAL=0 turns it off
+    watcher = radix_engine.ExplorerWatcher(load_explorer(), "strokes1.json",
+                                           float(os.environ.get("RADIX_RELOAD_INTERVAL", "2")), warm=("facets", "text_index", "ranks"))
+    if watcher.interval > 0:
+        watcher.start()
+    return watcher
+
+with timer.cached("data_load"):
+    watcher = start_reload_watcher()
+# One snapshot per rerun, even if a reload lands halfway through it
+explorer = watcher.current
+char_decomp = explorer.char_decomp
+
+def char_labels(char):
+    return radix_cards.char_labels(explorer, char)
+
+def option_label(labels, short, char):
+    cached = labels.get(char) or char_labels(char)
+    return cached[2] if short else cached[1]
+
+def label_func(labels):
+    # Bound now: AppTest and the frontend may format options outside a script run
+    return functools.partial(option_label, labels, st.session_state.get("short_labels", False))
+
+@st.cache_resource(max_entries=2)
+def build_label_cache(generation=0):
+    # Labels for every component, built once per data snapshot and shared by all sessions
+    radix_metrics.note_cache_miss("label_cache")
+    return {char: char_labels(char) for char in explorer.component_map}
+
+def phrase_mode(display_mode):
+    """Map an Output Type to the engine's phrase mode."""
+    if display_mode == "Single Character":
+        return None
+    if display_mode == "Phrases Containing It":
+        return radix_engine.ANY_POSITION
+    return int(display_mode[0])
+
+def containment_depth(containment):
+    """The depth limit a Containment choice sets, None for all depths or grouped."""
+    return containment if isinstance(containment, int) else None
+
+def containment_label(containment, counts):
+    # counts: depth -> results that deep, so each limit shows what it keeps
+    if containment == "all":
+        return f"All depths ({sum(counts.values())})"
+    if containment == GROUPED_BY_DEPTH:
+        return "Grouped by depth"
+    within = sum(n for depth, n in counts.items() if depth <= containment)
+    return f"Direct only ({within})" if containment == 1 else f"Within depth {containment} ({within})"
+
+def depth_label(depth):
+    if depth == 0:
+        return "The component itself"
+    if depth == 1:
+        return "Direct: in the character's own decomposition"
+    return f"{depth} decomposition steps down"
+
+def get_compounds(char, display_mode):
+    """Compound phrases shown for char under the given output type."""
+    return explorer.compounds_for(char, phrase_mode(display_mode))
+
+def active_filter(value):
+    """Map a widget's "No Filter" (or 0 strokes) value to the engine's None."""
+    return None if value == "No Filter" or value == 0 else value
+
+def report(type, message):
+    """Add a message to this session's bounded diagnostics log."""
+    st.session_state.diagnostic_messages.add(type, message)
+
+def parse_components(key):
+    """Components typed into a combination field; unknown characters are reported and skipped."""
+    comps = []
+    for char in dict.fromkeys(st.session_state[key]):
+        if char.isspace() or char in ",，、" or char in radix_engine.IDC_CHARS:
+            continue
+        if char in explorer.component_map:
+            comps.append(char)
+        else:
+            report("warning", f"'{char}' is not a known component; ignored in the combination.")
+    return comps
+
+def combined_query():
+    """(all_of, any_of, none_of) when combination fields are in use, else None."""
+    also, any_of, none_of = parse_components("also_contains"), parse_components("contains_any"), parse_components("excludes")
+    if not (also or any_of or none_of):
+        return None
+    return [st.session_state.selected_comp] + [c for c in also if c != st.session_state.selected_comp], any_of, none_of
+
+def describe_query(query):
+    all_of, any_of, none_of = query
+    text = " + ".join(all_of)
+    if any_of:
+        text += f" + any of {' '.join(any_of)}"
+    if none_of:
+        text += f" − {' − '.join(none_of)}"
+    return text
+
+def current_search():
+    """(header label, unfiltered characters) for a structure pattern or a
+    component combination, or None to show the selected component's results."""
+    pattern = st.session_state.structure_pattern.strip()
+    if pattern:
+        try:
+            return f"pattern {pattern}", explorer.structures.search(pattern)
+        except ValueError as e:
+            st.warning(f"Invalid structure pattern: {e}")
+            report("warning", f"Invalid structure pattern: {e}")
+    query = combined_query() if st.session_state.selected_comp else None
+    if query:
+        return describe_query(query), explorer.members.query(*query)
+    return None
 
 def on_text_input_change(component_map):
     text_value = st.session_state.text_input_comp.strip()
     st.session_state.debug_info = f"Input received: '{text_value}'"
-    if len(text_value) != 1:
-        warning_msg = "Please enter exactly one character."
-        st.session_state.diagnostic_messages.append({"type": "warning", "message": warning_msg})
-        st.session_state.text_input_comp = ""
-        st.session_state.debug_info += "; Invalid length"
-        return
+    st.session_state.text_matches = []
     if text_value in component_map or text_value in char_decomp:
         st.session_state.debug_info += f"; Valid component '{text_value}'"
         st.session_state.previous_selected_comp = st.session_state.selected_comp
         st.session_state.selected_comp = text_value
         st.session_state.text_input_comp = text_value
         st.session_state.page = 1
-    else:
-        warning_msg = "Invalid character. Please enter a valid component."
-        st.session_state.diagnostic_messages.append({"type": "warning", "message": warning_msg})
-        st.session_state.debug_info += f"; Invalid component '{text_value}'"
+        return
+    if text_value and not all(radix_engine.is_valid_char(c) for c in text_value):
+        # A reading or meaning: select the best match and offer the rest
+        matches = explorer.search_text(text_value)
+        st.session_state.debug_info += f"; {len(matches)} text matches"
+        if not matches:
+            report("warning", f"No characters match '{text_value}'.")
+            return
+        st.session_state.text_matches = matches
+        st.session_state.text_match = matches[0]
+        st.session_state.previous_selected_comp = st.session_state.selected_comp
+        st.session_state.selected_comp = matches[0]
+        st.session_state.page = 1
+        return
+    if len(text_value) != 1:
+        report("warning", "Please enter one character, a pinyin reading or an English word.")
         st.session_state.text_input_comp = ""
+        st.session_state.debug_info += "; Invalid length"
+        return
+    report("warning", "Invalid character. Please enter a valid component.")
+    st.session_state.debug_info += f"; Invalid component '{text_value}'"
+    st.session_state.text_input_comp = ""
+
+def on_text_match_select():
+    st.session_state.previous_selected_comp = st.session_state.selected_comp
+    st.session_state.selected_comp = st.session_state.text_match
+    st.session_state.page = 1
+    st.session_state.debug_info = f"Text match selected: '{st.session_state.text_match}'"
 
 def on_selectbox_change():
     st.session_state.previous_selected_comp = st.session_state.selected_comp
@@ -232,19 +376,29 @@ def on_selectbox_change():
     st.session_state.page = 1
     st.session_state.debug_info = f"Selectbox changed to '{st.session_state.selected_comp}'"
 
+def select_output_char(selected_char):
+    st.session_state.previous_selected_comp = st.session_state.selected_comp
+    st.session_state.selected_comp = selected_char
+    st.session_state.text_input_comp = selected_char
+    st.session_state.page = 1
+    st.session_state.debug_info = f"Output char selected: '{selected_char}'"
+
 def on_output_char_select(component_map):
     selected_char = st.session_state.output_char_select
     if selected_char == "Select a character..." or selected_char not in component_map:
         if selected_char != "Select a character...":
-            warning_msg = "Invalid character selected."
-            st.session_state.diagnostic_messages.append({"type": "warning", "message": warning_msg})
+            report("warning", "Invalid character selected.")
         st.session_state.output_char_select = "Select a character..."
         return
-    st.session_state.previous_selected_comp = st.session_state.selected_comp
-    st.session_state.selected_comp = selected_char
-    st.session_state.text_input_comp = selected_char
-    st.session_state.page = 1
-    st.session_state.debug_info = f"Output char selected: '{selected_char}'"
+    select_output_char(selected_char)
+
+def on_client_select():
+    # The results component only reports a click on a card's character
+    selected_char = (st.session_state.client_results or {}).get("select")
+    if selected_char not in explorer.component_map:
+        report("warning", f"'{selected_char}' is not a component of any character.")
+        return
+    select_output_char(selected_char)
 
 def on_reset_filters():
     st.session_state.stroke_count = 0
@@ -252,36 +406,44 @@ def on_reset_filters():
     st.session_state.component_idc = "No Filter"
     st.session_state.selected_idc = "No Filter"
     st.session_state.output_radical = "No Filter"
+    st.session_state.containment = "all"
     st.session_state.text_input_comp = ""
+    st.session_state.also_contains = ""
+    st.session_state.contains_any = ""
+    st.session_state.excludes = ""
+    st.session_state.structure_pattern = ""
+    st.session_state.text_matches = []
     st.session_state.page = 1
     st.session_state.debug_info = "Filters reset"
 
-def is_reset_needed():
-    return (
-        st.session_state.stroke_count != 0 or
-        st.session_state.radical != "No Filter" or
-        st.session_state.component_idc != "No Filter" or
-        st.session_state.selected_idc != "No Filter" or
-        st.session_state.output_radical != "No Filter"
-    )
+def on_page_change(delta):
+    st.session_state.page += delta
 
-def render_controls(component_map):
-    idc_descriptions = {
-        "No Filter": "No Filter",
-        "⿰": "Left Right",
-        "⿱": "Top sovereigntyottom",
-        "⿲": "Left Middle Right",
-        "⿳": "Top Middle Bottom",
-        "⿴": "Surround",
-        "⿵": "Surround Top",
-        "⿶": "Surround Bottom",
-        "⿷": "Surround Left",
-        "⿸": "Top Left Corner",
-        "⿹": "Top Right Corner",
-        "⿺": "Bottom Left Corner",
-        "⿻": "Overlaid"
-    }
+def reset_page():
+    st.session_state.page = 1
 
+def on_prepare_export(scopes, name):
+    """Stream the chosen export to a temp file for render_export to offer once."""
+    # Callbacks run before the script, so keys of widgets the last run left
+    # out may be missing
+    fmt = st.session_state.get("export_format", "CSV")
+    scope = st.session_state.get("export_scope", "All results")
+    extension, mime = radix_export.FORMATS[fmt]
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix="." + extension, delete=False) as f:
+        try:
+            radix_export.write_export(explorer, scopes[scope](), fmt, f,
+                                      phrase_mode(st.session_state.get("display_mode", DISPLAY_MODES[0])))
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    previous = st.session_state.export_file
+    if previous and os.path.exists(previous["path"]):
+        os.remove(previous["path"])
+    st.session_state.export_file = {"path": f.name, "name": radix_export.export_filename(name, fmt), "mime": mime,
+                                    "label": f"{scope}, {fmt}"}
+
+def render_component_controls(component_map, facets, labels):
     # Filter row for component input filters
     with st.container():
         st.markdown("### Component Filters")
@@ -289,25 +451,20 @@ def render_controls(component_map):
         col1, col2, col3 = st.columns([1, 1, 1])  # Adjusted to [1, 1, 1] for even distribution
 
         with col1:
-            stroke_counts = sorted(set(get_stroke_count(comp) for comp in component_map if get_stroke_count(comp) != -1))
+            with timer.phase("controls.stroke_options"):
+                stroke_options = [0] + facets.stroke_options()
+            timer.count("options_generated", len(stroke_options))
             st.selectbox(
                 "Filter by Strokes:",
-                options=[0] + stroke_counts,
+                options=stroke_options,
                 key="stroke_count",
                 format_func=lambda x: "No Filter" if x == 0 else str(x)
             )
 
         with col2:
-            pre_filtered_components = [
-                comp for comp in component_map
-                if (st.session_state.stroke_count == 0 or get_stroke_count(comp) == st.session_state.stroke_count)
-            ]
-            radicals = {"No Filter"} | {
-                char_decomp.get(comp, {}).get("radical", "")
-                for comp in pre_filtered_components
-                if char_decomp.get(comp, {}).get("radical", "")
-            }
-            radical_options = ["No Filter"] + sorted(radicals - {"No Filter"})
+            with timer.phase("controls.radical_options"):
+                radical_options = ["No Filter"] + facets.radical_options(active_filter(st.session_state.stroke_count))
+            timer.count("options_generated", len(radical_options))
             st.selectbox(
                 "Filter by Radical:",
                 options=radical_options,
@@ -315,42 +472,44 @@ def render_controls(component_map):
             )
 
         with col3:
-            pre_filtered_components = [
-                comp for comp in component_map
-                if (st.session_state.stroke_count == 0 or get_stroke_count(comp) == st.session_state.stroke_count) and
-                (st.session_state.radical == "No Filter" or char_decomp.get(comp, {}).get("radical", "") == st.session_state.radical)
-            ]
-            component_idc_options = {"No Filter"} | {
-                char_decomp.get(comp, {}).get("decomposition", "")[0]
-                for comp in pre_filtered_components
-                if char_decomp.get(comp, {}).get("decomposition", "") and char_decomp.get(comp, {}).get("decomposition", "")[0] in IDC_CHARS
-            }
-            component_idc_options = ["No Filter"] + sorted(component_idc_options - {"No Filter"})
+            with timer.phase("controls.idc_options"):
+                component_idc_options = ["No Filter"] + facets.idc_options(
+                    active_filter(st.session_state.stroke_count),
+                    active_filter(st.session_state.radical)
+                )
+            timer.count("options_generated", len(component_idc_options))
             st.selectbox(
                 "Filter by Structure IDC:",
                 options=component_idc_options,
-                format_func=lambda x: f"{x} ({idc_descriptions[x]})" if x != "No Filter" else x,
+                format_func=lambda x: f"{x} ({IDC_DESCRIPTIONS[x]})" if x != "No Filter" else x,
                 key="component_idc"
             )
 
     # Input row for component selection
     with st.container():
         st.markdown("### Select Input Component")
-        st.caption("Choose or type a single character to explore its related characters.")
+        st.caption("Choose a component, or type a character, a pinyin reading (shui, mu4) or an English word.")
         col4, col5 = st.columns([3, 1])  # Adjusted to [3, 1] for better balance
 
         with col4:
-            filtered_components = [
-                comp for comp in component_map
-                if (st.session_state.stroke_count == 0 or get_stroke_count(comp) == st.session_state.stroke_count) and
-                (st.session_state.radical == "No Filter" or char_decomp.get(comp, {}).get("radical", "") == st.session_state.radical) and
-                (st.session_state.component_idc == "No Filter" or
-                 char_decomp.get(comp, {}).get("decomposition", "").startswith(st.session_state.component_idc))
-            ]
-            # Add components from the selected character's decomposition
-            selected_char_components = get_all_components(st.session_state.selected_comp, max_depth=5) if st.session_state.selected_comp else set()
-            filtered_components.extend([comp for comp in selected_char_components if comp not in filtered_components])
-            sorted_components = sorted(filtered_components, key=get_stroke_count)
+            with timer.phase("controls.components"):
+                # Facet IDs are ranked by stroke count, so this list is already sorted
+                sorted_components = explorer.components(
+                    active_filter(st.session_state.stroke_count),
+                    active_filter(st.session_state.radical),
+                    active_filter(st.session_state.component_idc)
+                )
+                # Add components from the selected character's decomposition
+                selected_char_components = explorer.get_all_components(st.session_state.selected_comp) if st.session_state.selected_comp else set()
+                listed = set(sorted_components)
+                extra_components = [comp for comp in selected_char_components if comp not in listed]
+                if st.session_state.selected_comp in component_map and st.session_state.selected_comp not in listed:
+                    # A typed or clicked component stays selectable when the filters leave it out;
+                    # the keyed selectbox rejects a value outside its options
+                    extra_components.append(st.session_state.selected_comp)
+                if extra_components:
+                    sorted_components = explorer.ordered(sorted_components + extra_components)
+            timer.count("options_generated", len(sorted_components))
             selectbox_index = 0
             if sorted_components:
                 if (st.session_state.selected_comp not in sorted_components and
@@ -364,26 +523,19 @@ def render_controls(component_map):
             else:
                 st.session_state.selected_comp = ""
                 st.session_state.text_input_comp = ""
-                warning_msg = "No components match the current filters. Please adjust the stroke count, radical, or IDC filters."
-                st.session_state.diagnostic_messages.append({"type": "warning", "message": warning_msg})
+                report("warning", "No components match the current filters. Please adjust the stroke count, radical, or IDC filters.")
 
             if sorted_components:
+                label = label_func(labels)
                 st.selectbox(
                     "Select a component:",
                     options=sorted_components,
                     index=selectbox_index,
-                    format_func=lambda c: (
-                        c if c == "Select a component..." else
-                        f"{c} (Pinyin: {clean_field(char_decomp.get(c, {}).get('pinyin', '—'))}, "
-                        f"Strokes: {get_stroke_count(c) if get_stroke_count(c) != -1 else 'unknown'}, "
-                        f"Radical: {clean_field(char_decomp.get(c, {}).get('radical', '—'))}, "
-                        f"Decomposition: {format_decomposition(c)}, "
-                        f"Definition: {clean_field(char_decomp.get(c, {}).get('definition', 'No definition available'))}, "
-                        f"Etymology: {get_etymology_text(char_decomp.get(c, {}))})"
-                    ),
+                    format_func=lambda c: c if c == "Select a component..." else label(c),
                     key="selected_comp",
                     on_change=on_selectbox_change
                 )
+            st.checkbox("Short option labels (pinyin and strokes only)", key="short_labels")
 
         with col5:
             st.text_input(
@@ -392,9 +544,18 @@ def render_controls(component_map):
                 key="text_input_comp",
                 on_change=on_text_input_change,
                 args=(component_map,),
-                placeholder="Enter one Chinese character"
+                placeholder="木, mu4 or tree"
             )
+            if st.session_state.text_matches:
+                st.selectbox(
+                    "Matches:",
+                    options=st.session_state.text_matches,
+                    key="text_match",
+                    format_func=label_func(labels),
+                    on_change=on_text_match_select
+                )
 
+def render_paste_handler():
     # JavaScript to handle paste events
     components.html("""
         <script>
@@ -412,157 +573,365 @@ def render_controls(component_map):
         </script>
     """, height=0)
 
+def render_search_controls():
     with st.container():
-        st.button("Reset Filters", on_click=on_reset_filters, disabled=not is_reset_needed())
+        st.markdown("### Combine Components")
+        st.caption("Optionally type more components: results must also contain all of the first field, at least one of the second, and none of the third.")
+        col_all, col_any, col_none = st.columns([1, 1, 1])
+        with col_all:
+            st.text_input("Also contains all of:", key="also_contains", on_change=reset_page, placeholder="e.g. 口")
+        with col_any:
+            st.text_input("Contains any of:", key="contains_any", on_change=reset_page, placeholder="e.g. 木林")
+        with col_none:
+            st.text_input("Does not contain:", key="excludes", on_change=reset_page, placeholder="e.g. 木")
 
+    with st.container():
+        st.markdown("### Structural Search")
+        st.caption("Find characters by decomposition shape: an IDC followed by its parts, where ? matches any part and parts can nest. Replaces the component results while set.")
+        st.text_input("IDS pattern:", key="structure_pattern", on_change=reset_page, placeholder="e.g. ⿰氵? or ⿰亻⿱??")
+
+    with st.container():
+        # Always enabled: most filters live in rerun regions, whose changes
+        # would leave a disabled state drawn here out of date
+        st.button("Reset Filters", on_click=on_reset_filters)
+
+def keep_widget_state(keys):
+    """Carry widget values over a run that does not draw their widgets;
+    Streamlit drops a widget's keyed state at the end of such a run."""
+    for key in keys:
+        if key in st.session_state:
+            st.session_state[key] = st.session_state[key]
+
+def render_output_controls(facets, search):
     with st.container():
         st.markdown("### Filter Output Characters")
         st.caption("Customize the output by character structure and display mode.")
-        col6, col7, col8 = st.columns([1, 1, 1])  # Adjusted to [1, 1, 1] for even distribution
+        col6, col7, col8, col9 = st.columns([1, 1, 1, 1])
 
         with col6:
-            chars = component_map.get(st.session_state.selected_comp, [])
-            dynamic_idc_options = {"No Filter"} | {
-                char_decomp.get(char, {}).get("decomposition", "")[0]
-                for char in chars
-                if char_decomp.get(char, {}).get("decomposition", "") and char_decomp.get(char, {}).get("decomposition", "")[0] in IDC_CHARS
-            }
-            idc_options = ["No Filter"] + sorted(dynamic_idc_options - {"No Filter"})
+            with timer.phase("controls.result_options"):
+                if search:
+                    result_idcs, result_radicals = facets.options_for(search[1])
+                else:
+                    result_idcs, result_radicals = facets.result_options(st.session_state.selected_comp)
+            idc_options = ["No Filter"] + result_idcs
+            timer.count("options_generated", len(result_idcs) + len(result_radicals) + 2)
+            if st.session_state.selected_idc not in idc_options:
+                st.session_state.selected_idc = "No Filter"
             st.selectbox(
                 "Result IDC:",
                 options=idc_options,
-                format_func=lambda x: f"{x} ({idc_descriptions.get(x, x)})" if x != "No Filter" else x,
-                index=idc_options.index(st.session_state.selected_idc) if st.session_state.selected_idc in idc_options else 0,
-                key="selected_idc"
+                format_func=lambda x: f"{x} ({IDC_DESCRIPTIONS.get(x, x)})" if x != "No Filter" else x,
+                key="selected_idc",
+                on_change=reset_page
             )
         with col7:
-            output_radicals = {"No Filter"} | {
-                char_decomp.get(char, {}).get("radical", "")
-                for char in chars
-                if char_decomp.get(char, {}).get("radical", "")
-            }
-            output_radical_options = ["No Filter"] + sorted(output_radicals - {"No Filter"})
+            output_radical_options = ["No Filter"] + result_radicals
             st.selectbox(
                 "Result Radical:",
                 options=output_radical_options,
-                key="output_radical"
+                key="output_radical",
+                on_change=reset_page
             )
         with col8:
-            st.radio("Output Type:", options=["Single Character", "2-Character Phrases", "3-Character Phrases", "4-Character Phrases"], key="display_mode", horizontal=True)
-
-def render_char_card(char, compounds):
-    entry = char_decomp.get(char, {})
-    decomposition = format_decomposition(char)
-    fields = {
-        "Pinyin": clean_field(entry.get("pinyin", "—")),
-        "Strokes": f"{get_stroke_count(char)} strokes" if get_stroke_count(char) != -1 else "unknown strokes",
-        "Radical": clean_field(entry.get("radical", "—")),
-        "Decomposition": decomposition,
-        "Definition": clean_field(entry.get("definition", "No definition available")),
-        "Etymology": get_etymology_text(entry)
-    }
-    details = " ".join(f"<strong>{k}:</strong> {v}" for k, v in fields.items())
-    st.markdown(f"""<div class='char-card'><h3 class='char-title'>{char}</h3><p class='details'>{details}</p>""", unsafe_allow_html=True)
-    if compounds and st.session_state.display_mode != "Single Character":
-        compounds_text = " ".join(sorted(compounds))
-        st.markdown(f"""<div class='compounds-section'><p class='compounds-title'>{st.session_state.display_mode} for {char}:</p><p class='compounds-list'>{compounds_text}</p></div>""", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-def main():
-    component_map = build_component_map(max_depth=5)
-    apply_dynamic_css()
-    st.markdown("<h1>🈑 Radix</h1>", unsafe_allow_html=True)
+            st.radio("Output Type:", options=DISPLAY_MODES, key="display_mode", horizontal=True, on_change=reset_page)
+        with col9:
+            # Depth limits are slices of one index; set queries have no depth to slice by
+            counts = {} if search else explorer.depth_counts(st.session_state.selected_comp)
+            st.selectbox(
+                "Containment:",
+                options=["all"] + list(range(1, explorer.containment_limit)) + [GROUPED_BY_DEPTH],
+                format_func=lambda value: containment_label(value, counts),
+                key="containment",
+                on_change=reset_page,
+                disabled=bool(search)
+            )
 
-    render_controls(component_map)
-    if not st.session_state.selected_comp:
+@st.cache_data(max_entries=20000)
+def char_card_html(char, display_mode, generation=0):
+    radix_metrics.note_cache_miss("cards")
+    cached = build_label_cache(generation).get(char) or char_labels(char)
+    title = f"Phrases containing {char}" if display_mode == "Phrases Containing It" else f"{display_mode} for {char}"
+    return radix_cards.char_card_html(char, cached[0], get_compounds(char, display_mode), title)
+
+def render_char_cards(chars):
+    # One markdown block per page instead of several elements per card
+    with timer.cached("cards", calls=len(chars)):
+        st.markdown("".join(char_card_html(char, st.session_state.display_mode, explorer.generation) for char in chars), unsafe_allow_html=True)
+    timer.count("cards_emitted", len(chars))
+
+def render_pagination(total):
+    """Draw page controls and return the (start, end) slice of results to show."""
+    page_count = max(1, -(-total // st.session_state.results_per_page))
+    st.session_state.page = min(max(1, st.session_state.page), page_count)
+    start = (st.session_state.page - 1) * st.session_state.results_per_page
+    end = min(start + st.session_state.results_per_page, total)
+    col_prev, col_info, col_next, col_size, col_order = st.columns([1, 2, 1, 1, 1])
+    with col_prev:
+        st.button("◀ Previous", key="page_prev", on_click=on_page_change, args=(-1,), disabled=st.session_state.page <= 1)
+    with col_info:
+        st.markdown(f"Page {st.session_state.page} of {page_count} (results {start + 1}–{end})")
+    with col_next:
+        st.button("Next ▶", key="page_next", on_click=on_page_change, args=(1,), disabled=st.session_state.page >= page_count)
+    with col_size:
+        st.selectbox("Per page:", options=[25, 50, 100, 200], key="results_per_page", on_change=reset_page)
+    with col_order:
+        st.selectbox("Order by:", options=list(radix_engine.RESULT_ORDERS), key="result_order",
+                     format_func=radix_engine.RESULT_ORDERS.get, on_change=reset_page)
+    return start, end
+
+@st.cache_resource(max_entries=64)
+def client_payload(query, generation=0, _chars=()):
+    # One payload per result set and data snapshot, shared by all sessions
+    radix_metrics.note_cache_miss("client_payload")
+    depths = None
+    if query[0] == "component":
+        depths = dict(zip(_chars, explorer.component_map.member_depths(query[1]))) if _chars else {}
+    return radix_client.result_payload(explorer, _chars, depths)
+
+def unfiltered_results(component_map, search):
+    return search[1] if search else component_map.get(st.session_state.selected_comp, [])
+
+def render_client_results(chars, search):
+    """Hand the whole unfiltered result set to the browser component."""
+    kind, name = ("search", search[0]) if search else ("component", st.session_state.selected_comp)
+    with timer.cached("client_payload"):
+        payload = client_payload((kind, name), explorer.generation, chars)
+    timer.count("client_rows", len(payload["rows"]))
+    client_results(
+        payload=payload,
+        snapshot=f"{explorer.generation}:{kind}:{name}",
+        name=name,
+        state={
+            "idc": st.session_state.selected_idc,
+            "radical": st.session_state.output_radical,
+            "mode": st.session_state.display_mode,
+            "order": st.session_state.result_order,
+            "per_page": st.session_state.results_per_page,
+            "containment": st.session_state.containment,
+        },
+        modes=DISPLAY_MODES,
+        idc_labels=IDC_DESCRIPTIONS,
+        order_labels=radix_engine.RESULT_ORDERS,
+        font_scale=st.session_state.font_scale,
+        key="client_results",
+        on_change=on_client_select,
+        default=None
+    )
+    with st.expander("Export"):
+        st.caption("Filters set above apply in the browser only; exports cover the unfiltered results.")
+        order = st.session_state.result_order
+        render_export({
+            "All results": lambda: explorer.ordered(chars, order),
+            "Full dataset": lambda: explorer.char_decomp,
+        }, name)
+
+def render_export(scopes, name):
+    offered = [scope for scope in EXPORT_SCOPES if scope in scopes]
+    if st.session_state.get("export_scope") not in offered:
+        # Say "Current page", chosen before the browser took over paging
+        st.session_state.export_scope = "All results"
+    col_scope, col_format, col_prepare = st.columns([2, 1, 1])
+    with col_scope:
+        st.radio("Scope:", options=offered, key="export_scope", horizontal=True)
+    with col_format:
+        st.selectbox("Format:", options=list(radix_export.FORMATS), key="export_format")
+    with col_prepare:
+        st.button("Prepare export", key="prepare_export", on_click=on_prepare_export, args=(scopes, name))
+    st.caption("Every format carries pinyin, strokes, radical, decomposition, definition and the compounds "
+               "the current Output Type shows; Compounds is a de-duplicated phrase list to paste into a chatbot.")
+    export_file = st.session_state.export_file
+    if export_file:
+        # download_button reads the whole file into the media file manager on
+        # every run that draws it, so it is drawn once, right after Prepare
+        # export, and the temp file goes as soon as it has been read
+        st.session_state.export_file = None
+        try:
+            with timer.phase("export"), open(export_file["path"], "rb") as f:
+                st.download_button(f"Download {export_file['name']} ({export_file['label']})", data=f,
+                                   file_name=export_file["name"], mime=export_file["mime"], key="download_export")
+        finally:
+            os.remove(export_file["path"])
+        st.caption("The download is offered until the page next changes; prepare the export again after that.")
+
+def diagnostic_html(msg):
+    class_name = 'error' if msg['type'] == 'error' else 'warning'
+    count = f" (×{msg['count']})" if msg.get('count', 1) > 1 else ""
+    return f"<p class='diagnostic-message {class_name}'>{msg['type'].capitalize()}: {html.escape(msg['message'])}{count}</p>"
+
+def render_diagnostics(shown=DIAGNOSTICS_SHOWN):
+    session_log = st.session_state.diagnostic_messages
+    messages = list(session_log)[::-1]
+    if session_log.dropped:
+        st.caption(f"{session_log.dropped} older messages dropped")
+    load_messages = explorer.diagnostics
+    if watcher.last_error:
+        load_messages = ({"type": "error", "message": watcher.last_error},) + load_messages
+    messages.extend(load_messages[:max(shown - len(messages), 0)])
+    st.markdown("".join(diagnostic_html(msg) for msg in messages), unsafe_allow_html=True)
+    hidden = len(load_messages) - (len(messages) - len(session_log))
+    if hidden > 0:
+        st.caption(f"{len(load_messages)} data-quality warnings from loading; {hidden} more not shown")
+
+def render_performance():
+    st.markdown("### Performance")
+    summary = radix_metrics.REGISTRY.summary()
+    rows = [{
+        "Phase": name,
+        "This rerun (ms)": round(seconds * 1000, 2),
+        "p50 (ms)": round(summary[name][0] * 1000, 2) if name in summary else None,
+        "p95 (ms)": round(summary[name][1] * 1000, 2) if name in summary else None,
+    } for name, seconds in timer.phases.items()]
+    if "rerun" in summary:
+        rows.append({"Phase": "rerun (total, previous reruns)", "This rerun (ms)": round(timer.elapsed() * 1000, 2),
+                     "p50 (ms)": round(summary["rerun"][0] * 1000, 2), "p95 (ms)": round(summary["rerun"][1] * 1000, 2)})
+    st.table(rows)
+    st.write("Counters: " + ", ".join(f"{name}={value}" for name, value in sorted(timer.counters.items())))
+
+def page_state():
+    """What the page outside a rerun region depends on: the selected
+    component and the label mode, which the results region's options share
+    with the component region."""
+    return st.session_state.selected_comp, st.session_state.short_labels
+
+def rerun_region(fn):
+    """Make fn a fragment: changing a widget inside it reruns only fn.
+
+    A region rerun is timed as a rerun of its own. If it changes
+    page_state(), say by selecting another component, the whole app
+    reruns so everything else follows.
+    """
+    @st.fragment
+    @functools.wraps(fn)
+    def region(*args):
+        global timer
+        if full_run:
+            return fn(*args)
+        timer = radix_metrics.start_rerun()
+        try:
+            if page_state() == drawn_state:
+                fn(*args)
+        finally:
+            radix_metrics.finish_rerun(timer, {
+                "region": fn.__name__,
+                "selected_comp": st.session_state.get("selected_comp", ""),
+                "display_mode": st.session_state.get("display_mode", "")
+            })
+        if page_state() != drawn_state:
+            st.rerun()
+    return region
+
+@rerun_region
+def component_region(component_map, facets, labels):
+    render_component_controls(component_map, facets, labels)
+
+@rerun_region
+def results_region(component_map, facets, labels, search):
+    client_side = CLIENT_RESULTS and len(unfiltered_results(component_map, search)) <= radix_client.MAX_ROWS
+    if client_side:
+        # The browser component takes these over; keep them for when a
+        # larger result set brings the server-side widgets back
+        keep_widget_state(OUTPUT_KEYS + PAGINATION_KEYS)
+    else:
+        render_output_controls(facets, search)
+    if not st.session_state.selected_comp and not search:
+        keep_widget_state(PAGINATION_KEYS)
         st.info("Please select or type a component to view results.")
         return
 
-    entry = char_decomp.get(st.session_state.selected_comp, {})
-    fields = {
-        "Pinyin": clean_field(entry.get("pinyin", "—")),
-        "Strokes": f"{get_stroke_count(st.session_state.selected_comp)} strokes" if get_stroke_count(st.session_state.selected_comp) != -1 else "unknown strokes",
-        "Radical": clean_field(entry.get("radical", "—")),
-        "Decomposition": format_decomposition(st.session_state.selected_comp),
-        "Definition": clean_field(entry.get("definition", "No definition available")),
-        "Etymology": get_etymology_text(entry)
-    }
-    details = " ".join(f"<strong>{k}:</strong> {v}" for k, v in fields.items())
-    st.markdown(f"""<div class='selected-card'><h2 class='selected-char'>{st.session_state.selected_comp}</h2><p class='details'>{details}</p></div>""", unsafe_allow_html=True)
+    if st.session_state.selected_comp and not st.session_state.structure_pattern.strip():
+        cached = labels.get(st.session_state.selected_comp) or char_labels(st.session_state.selected_comp)
+        st.markdown(radix_cards.selected_card_html(st.session_state.selected_comp, cached[0]), unsafe_allow_html=True)
+    if client_side:
+        render_client_results(unfiltered_results(component_map, search), search)
+        return
 
     # Compute output characters without component filter influence
-    chars = [c for c in component_map.get(st.session_state.selected_comp, []) if c in char_decomp]
-    if st.session_state.selected_idc != "No Filter":
-        chars = [c for c in chars if char_decomp.get(c, {}).get("decomposition", "").startswith(st.session_state.selected_idc)]
-    if st.session_state.output_radical != "No Filter":
-        chars = [c for c in chars if char_decomp.get(c, {}).get("radical", "") == st.session_state.output_radical]
-
-    char_compounds = {
-        c: [] if st.session_state.display_mode == "Single Character" else [
-            comp for comp in char_decomp.get(c, {}).get("compounds", [])
-            if len(comp) == int(st.session_state.display_mode[0])
-        ]
-        for c in chars
-    }
-    filtered_chars = chars if st.session_state.display_mode == "Single Character" else [c for c in chars if char_compounds[c]]
+    with timer.phase("results"):
+        if search:
+            filtered_chars = explorer.filter_results(
+                search[1],
+                radical=active_filter(st.session_state.output_radical),
+                idc=active_filter(st.session_state.selected_idc),
+                phrases=phrase_mode(st.session_state.display_mode)
+            )
+        elif st.session_state.containment == GROUPED_BY_DEPTH:
+            groups = explorer.results_by_depth(
+                st.session_state.selected_comp,
+                radical=active_filter(st.session_state.output_radical),
+                idc=active_filter(st.session_state.selected_idc),
+                phrases=phrase_mode(st.session_state.display_mode)
+            )
+            filtered_chars = [char for chars in groups.values() for char in chars]
+        else:
+            filtered_chars = explorer.results(
+                st.session_state.selected_comp,
+                radical=active_filter(st.session_state.output_radical),
+                idc=active_filter(st.session_state.selected_idc),
+                phrases=phrase_mode(st.session_state.display_mode),
+                depth=containment_depth(st.session_state.containment)
+            )
+    grouped = not search and st.session_state.containment == GROUPED_BY_DEPTH
 
     if filtered_chars:
-        # Add components from the selected character's decomposition to output options
-        selected_char_components = get_all_components(st.session_state.selected_comp, max_depth=5) if st.session_state.selected_comp else set()
-        output_options = sorted(filtered_chars, key=get_stroke_count)
-        output_options.extend([comp for comp in selected_char_components if comp not in output_options and comp in char_decomp])
-        options = ["Select a character..."] + sorted(output_options, key=get_stroke_count)
-        if (st.session_state.previous_selected_comp and
-                st.session_state.previous_selected_comp != st.session_state.selected_comp and
-                st.session_state.previous_selected_comp not in output_options and
-                st.session_state.previous_selected_comp in component_map):
-            options.insert(1, st.session_state.previous_selected_comp)
+        with timer.phase("output_options"):
+            # Add components from the selected character's decomposition to output options
+            selected_char_components = explorer.get_all_components(st.session_state.selected_comp) if st.session_state.selected_comp else set()
+            listed = set(filtered_chars)
+            output_options = filtered_chars + [comp for comp in selected_char_components if comp not in listed and comp in char_decomp]
+            options = ["Select a character..."] + explorer.ordered(output_options, st.session_state.result_order)
+            if (st.session_state.previous_selected_comp and
+                    st.session_state.previous_selected_comp != st.session_state.selected_comp and
+                    st.session_state.previous_selected_comp not in output_options and
+                    st.session_state.previous_selected_comp in component_map):
+                options.insert(1, st.session_state.previous_selected_comp)
+        timer.count("options_generated", len(options))
+        label = label_func(labels)
         st.selectbox(
             "Select a character from the list below:",
             options=options,
             key="output_char_select",
             on_change=on_output_char_select,
             args=(component_map,),
-            format_func=lambda c: (
-                c if c == "Select a character..." else
-                f"{c} (Pinyin: {clean_field(char_decomp.get(c, {}).get('pinyin', '—'))}, "
-                f"Strokes: {get_stroke_count(c) if get_stroke_count(c) != -1 else 'unknown'}, "
-                f"Radical: {clean_field(char_decomp.get(c, {}).get('radical', '—'))}, "
-                f"Decomposition: {format_decomposition(c)}, "
-                f"Definition: {clean_field(char_decomp.get(c, {}).get('definition', 'No definition available'))}, "
-                f"Etymology: {get_etymology_text(char_decomp.get(c, {}))})"
-            )
+            format_func=lambda c: c if c == "Select a character..." else label(c)
         )
 
-    st.markdown(f"<h2 class='results-header'>🧬 Results for {st.session_state.selected_comp} — {len(filtered_chars)} result(s)</h2>", unsafe_allow_html=True)
-    for char in sorted(filtered_chars, key=get_stroke_count):
-        render_char_card(char, char_compounds.get(char, []))
-
-    if filtered_chars and st.session_state.display_mode != "Single Character":
-        with st.expander("Export Compounds"):
-            st.caption("Copy this text to get pinyin and meanings for the displayed compounds.")
-            export_text = "Give me the hanyu pinyin and meaning of each compound phrase in one line a phrase in a downloadable word file\n\n"
-            export_text += "\n".join(
-                compound
-                for char in filtered_chars
-                for compound in char_compounds.get(char, [])
-            )
-            st.text_area("Export Text", export_text, height=200, key="export_text")
-            components.html(f"""
-                <textarea id="copyTarget" style="opacity:0;position:absolute;left-9999px;">{export_text}</textarea>
-                <script>
-                const copyText = document.getElementById("copyTarget");
-                copyText.select();
-                document.execCommand("copy");
-                </script>
-            """, height=0)
+    st.markdown(f"<h2 class='results-header'>🧬 Results for {html.escape(search[0]) if search else st.session_state.selected_comp} — {len(filtered_chars)} result(s)</h2>", unsafe_allow_html=True)
+    page_chars = []
+    order = st.session_state.result_order
+    def all_ordered():
+        if grouped:
+            return [char for chars in groups.values() for char in explorer.ordered(chars, order)]
+        return explorer.ordered(filtered_chars, order)
+    if filtered_chars:
+        start, end = render_pagination(len(filtered_chars))
+        with timer.phase("ordering"):
+            # Only ranks as far as the end of this page, except across depth groups
+            page_chars = all_ordered()[start:end] if grouped else explorer.ordered(filtered_chars, order, limit=end)[start:end]
+        if grouped:
+            depths = {char: depth for depth, chars in groups.items() for char in chars}
+            for depth in dict.fromkeys(depths[char] for char in page_chars):
+                st.markdown(f"#### {depth_label(depth)} ({len(groups[depth])})")
+                render_char_cards([char for char in page_chars if depths[char] == depth])
+        else:
+            render_char_cards(page_chars)
+    else:
+        keep_widget_state(PAGINATION_KEYS)
 
-    # Render debug information and diagnostics at the end
-    radicals = [comp for comp in component_map if char_decomp.get(comp, {}).get("radical", "") == comp]
+    with st.expander("Export"):
+        render_export({
+            "Current page": lambda: page_chars,
+            "All results": all_ordered,
+            "Full dataset": lambda: explorer.char_decomp,
+        }, search[0] if search else st.session_state.selected_comp)
+
+def render_debug(component_map):
+    radicals = explorer.radicals()
     with st.expander("Debug Information (For Developers)", expanded=False):
         st.markdown("<div class='debug-section'>", unsafe_allow_html=True)
         st.slider("Adjust Font Size:", 0.7, 1.3, st.session_state.font_scale, 0.1, key="font_scale")
         st.write(f"Total components: {len(component_map)}, Radicals: {len(radicals)}")
+        st.write(f"Data snapshot: reload {explorer.generation}")
         st.write(f"Current text_input_comp: '{st.session_state.get('text_input_comp', '')}'")
         st.write(f"Current selected_comp: '{st.session_state.get('selected_comp', '')}'")
         st.write(f"Stroke count: {st.session_state.get('stroke_count', 0)}")
@@ -570,11 +939,41 @@ def main():
         st.write(f"Structure IDC: {st.session_state.get('component_idc', 'No Filter')}")
         st.write(f"Font scale: {st.session_state.font_scale}")
         st.write(f"Debug log: {st.session_state.get('debug_info', '')}")
+        render_performance()
         st.markdown("### Errors and Warnings")
-        for msg in st.session_state.diagnostic_messages:
-            class_name = 'error' if msg['type'] == 'error' else 'warning'
-            st.markdown(f"<p class='diagnostic-message {class_name}'>{msg['type'].capitalize()}: {msg['message']}</p>", unsafe_allow_html=True)
+        render_diagnostics()
         st.markdown("</div>", unsafe_allow_html=True)
 
+def main():
+    component_map = explorer.component_map
+    apply_dynamic_css()
+    st.markdown("<h1>🈑 Radix</h1>", unsafe_allow_html=True)
+
+    with timer.cached("label_cache"):
+        labels = build_label_cache(explorer.generation)
+    with timer.cached("facet_index"):
+        if "facets" not in vars(explorer):
+            radix_metrics.note_cache_miss("facet_index")
+        facets = explorer.facets
+    with timer.phase("search"):
+        search = current_search()
+    component_region(component_map, facets, labels)
+    render_paste_handler()
+    render_search_controls()
+    results_region(component_map, facets, labels, search)
+    if not st.session_state.selected_comp and not search:
+        return
+    # Render debug information and diagnostics at the end
+    render_debug(component_map)
+
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        radix_metrics.finish_rerun(timer, {
+            "selected_comp": st.session_state.get("selected_comp", ""),
+            "display_mode": st.session_state.get("display_mode", "")
+        })
+        # Read by region reruns, which run without the rest of this script
+        drawn_state = page_state()
+        full_run = False
@@ -0,0 +1,316 @@
+"""Drive many simulated sessions of the Streamlit app and report how one process copes.
+
+    python benchmarks/load_test.py --sessions 20 --actions 30 --size 20000
+    python benchmarks/load_test.py --sessions 50 --data strokes1.json --mix filters -o load.json
+
+Each session is a streamlit.testing AppTest running App1.py headlessly. All
+sessions share this process, and so the cached explorer and label cache, as
+browser tabs on one server worker do. Sessions start one after another (the
+app picks a random starting configuration, seeded per session here), then
+run a scripted mix of interactions from `--concurrency` threads, as the
+server runs one script thread per session. AppTest swaps a mock Runtime in
+and out around every run, so runs on several threads at once tear down each
+other's; here they take turns, and sessions interleave between reruns. The
+report has rerun latency percentiles overall and per action (the run
+itself) and the time reruns waited for their turn, throughput, process RSS
+growth and session-state growth per session, plus the app's own phase
+timings from radix_metrics. Runs offline against a synthetic or real
+strokes1.json.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import radix_engine
+import radix_metrics
+from benchmarks import synth_data
+from benchmarks.run_bench import git_revision
+
+APP_PATH = os.path.join(ROOT, "App1.py")
+
+# AppTest runs are not thread-safe (see the module docstring)
+RUN_LOCK = threading.Lock()
+
+# Interaction mixes: action name -> relative weight
+MIXES = {
+    "browse": {"type_component": 3, "result_filter": 2, "display_mode": 2, "page": 3, "component_filter": 1},
+    "filters": {"type_component": 1, "result_filter": 4, "component_filter": 3, "display_mode": 2},
+    "paging": {"type_component": 1, "display_mode": 1, "page": 6},
+}
+
+def percentiles(values):
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        **{f"p{round(q * 100)}_ms": radix_metrics.percentile(ordered, q) * 1000 for q in (0.5, 0.9, 0.99)},
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def rss_bytes():
+    """This process's resident set size now (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def deep_size(obj, seen=None):
+    """Bytes held by obj and everything it references that is not shared module state."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, type) or type(obj).__name__ == "module":
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen)
+    return size
+
+def session_state_size(at):
+    """Bytes held by the session's public state: user keys and keyed widgets."""
+    state = at.session_state
+    # Newer AppTests wrap the state in a mapping; 1.37 hands over SafeSessionState
+    keys = state.keys() if hasattr(state, "keys") else state.filtered_state.keys()
+    return deep_size({key: state[key] for key in keys})
+
+def option_value(key, label):
+    """The raw option behind a selectbox label; AppTest only sees format_func's output."""
+    if key == "stroke_count":
+        return 0 if label == "No Filter" else int(label)
+    if key in ("selected_idc", "component_idc") and label[:1] in radix_engine.IDC_CHARS:
+        # "⿰ (Left Right)"
+        return label[0]
+    return label
+
+def component_pool(json_path):
+    """Components to type, weighted by how often decompositions use them."""
+    char_decomp, _ = radix_engine.load_json_entries(json_path)
+    return [comp for char, entry in char_decomp.items() for comp in radix_engine.direct_components(char, entry)]
+
+class Session:
+    """One simulated user: an AppTest plus the scripted choices it makes."""
+
+    def __init__(self, number, seed, pool, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.number = number
+        self.rng = random.Random(seed)
+        self.pool = pool
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.latencies = defaultdict(list)
+        self.waits = []
+        self.errors = []
+        self.state_bytes = []
+
+    def run(self, action):
+        queued = time.perf_counter()
+        with RUN_LOCK:
+            start = time.perf_counter()
+            self.at.run()
+            self.latencies[action].append(time.perf_counter() - start)
+        self.waits.append(start - queued)
+        if self.at.exception:
+            self.errors.append(f"{action}: {self.at.exception[0].message}")
+
+    def widget(self, kind, key):
+        # None when the app did not draw it this run (say, no results to filter)
+        try:
+            return getattr(self.at, kind)(key=key)
+        except KeyError:
+            return None
+
+    def choose_option(self, key):
+        box = self.widget("selectbox", key)
+        if box is None or not box.options:
+            return False
+        # select_index would set the formatted label as the value
+        box.set_value(option_value(key, self.rng.choice(box.options)))
+        return True
+
+    def type_component(self):
+        # Missing only when the last run raised before drawing it
+        field = self.widget("text_input", "text_input_comp")
+        if field is None:
+            return False
+        field.set_value(self.rng.choice(self.pool))
+        return True
+
+    def result_filter(self):
+        return self.choose_option(self.rng.choice(["selected_idc", "output_radical"]))
+
+    def component_filter(self):
+        return self.choose_option(self.rng.choice(["stroke_count", "radical", "component_idc"]))
+
+    def display_mode(self):
+        radio = self.widget("radio", "display_mode")
+        if radio is None:
+            return False
+        radio.set_value(self.rng.choice(radio.options))
+        return True
+
+    def page(self):
+        for key in ("page_next", "page_prev"):
+            button = self.widget("button", key)
+            if button is not None and not button.disabled:
+                button.click()
+                return True
+        return False
+
+    def start(self, seed):
+        # init_session_state draws from the global random module
+        random.seed(seed)
+        self.run("start")
+        self.state_bytes.append(session_state_size(self.at))
+
+    def act(self, mix, count):
+        names, weights = zip(*MIXES[mix].items())
+        for _ in range(count):
+            action = self.rng.choices(names, weights)[0]
+            # An action with nothing to act on this time falls back to typing a
+            # component, or to a plain rerun after a run that raised
+            if not getattr(self, action)():
+                action = "type_component" if self.type_component() else "rerun"
+            self.run(action)
+        self.state_bytes.append(session_state_size(self.at))
+
+def run_load(json_path, args):
+    pool = component_pool(json_path)
+    memory = {"rss_before": rss_bytes()}
+    sessions = [Session(n, args.seed + n, pool, args.timeout) for n in range(args.sessions)]
+    started = time.perf_counter()
+    for n, session in enumerate(sessions):
+        session.start(args.seed + n)
+        if n == 0:
+            # The first session pays for loading the data and building the shared caches
+            memory["rss_after_first"] = rss_bytes()
+    memory["rss_after_start"] = rss_bytes()
+    start_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency or args.sessions) as pool_executor:
+        for future in [pool_executor.submit(session.act, args.mix, args.actions) for session in sessions]:
+            future.result()
+    wall = time.perf_counter() - started
+    memory["rss_after_actions"] = rss_bytes()
+
+    by_action = defaultdict(list)
+    for session in sessions:
+        for action, latencies in session.latencies.items():
+            by_action[action].append(latencies)
+    acted = [latency for action, runs in by_action.items() if action != "start" for latencies in runs for latency in latencies]
+    state_sizes = [session.state_bytes[-1] for session in sessions]
+    state_growth = [session.state_bytes[-1] - session.state_bytes[0] for session in sessions]
+    extra_sessions = max(1, args.sessions - 1)
+    return {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency or args.sessions,
+        "mix": args.mix,
+        "actions_per_session": args.actions,
+        "start_seconds": start_seconds,
+        "wall_seconds": wall,
+        "reruns_per_second": len(acted) / wall if wall else 0.0,
+        "latency": percentiles(acted),
+        "latency_by_action": {
+            action: percentiles([latency for latencies in runs for latency in latencies])
+            for action, runs in sorted(by_action.items())
+        },
+        # Each session's first wait is its start, which runs alone
+        "turn_wait": percentiles([wait for session in sessions for wait in session.waits[1:]]),
+        "memory": {
+            **memory,
+            "rss_per_session_start": (memory["rss_after_start"] - memory["rss_after_first"]) / extra_sessions,
+            "rss_growth_during_actions": memory["rss_after_actions"] - memory["rss_after_start"],
+            "session_state_bytes": {"mean": statistics.fmean(state_sizes), "max": max(state_sizes)},
+            "session_state_growth_bytes": {"mean": statistics.fmean(state_growth), "max": max(state_growth)},
+        },
+        "app_phases": {
+            name: {"p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "samples": samples}
+            for name, (p50, p95, samples) in sorted(radix_metrics.REGISTRY.summary().items())
+        },
+        "errors": [f"session {session.number}: {error}" for session in sessions for error in session.errors],
+    }
+
+def print_summary(result):
+    print(f"{result['sessions']} sessions, {result['concurrency']} threads, mix {result['mix']}: "
+          f"{result['reruns_per_second']:.1f} reruns/s over {result['wall_seconds']:.1f} s", file=sys.stderr)
+    print(f"  {'action':<18}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}", file=sys.stderr)
+    for action, stats in [("all", result["latency"])] + list(result["latency_by_action"].items()):
+        if stats["count"]:
+            print(f"  {action:<18}{stats['count']:>7}{stats['p50_ms']:10.1f}{stats['p90_ms']:10.1f}"
+                  f"{stats['p99_ms']:10.1f}{stats['max_ms']:10.1f}", file=sys.stderr)
+    wait = result["turn_wait"]
+    if wait["count"]:
+        print(f"  reruns waited {wait['p50_ms']:.1f} ms (p50), {wait['p99_ms']:.1f} ms (p99) for their turn",
+              file=sys.stderr)
+    memory = result["memory"]
+    print(f"  RSS {memory['rss_before'] / 2**20:.0f} MiB before, {memory['rss_after_first'] / 2**20:.0f} after the first "
+          f"session, +{memory['rss_per_session_start'] / 2**20:.2f} MiB per further session, "
+          f"+{memory['rss_growth_during_actions'] / 2**20:.1f} MiB while acting", file=sys.stderr)
+    print(f"  session state grew {memory['session_state_growth_bytes']['mean'] / 1024:.1f} KiB per session "
+          f"on average (max {memory['session_state_growth_bytes']['max'] / 1024:.1f} KiB)", file=sys.stderr)
+    if result["errors"]:
+        print(f"  {len(result['errors'])} errors, first: {result['errors'][0]}", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Streamlit app with simulated sessions.")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=0, help="threads acting at once (0: one per session)")
+    parser.add_argument("--actions", type=int, default=20, help="interactions per session")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="browse")
+    parser.add_argument("--size", type=int, default=10000, help="characters in the synthetic dataset")
+    parser.add_argument("--data", help="a real strokes1.json instead of synthetic data")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds one rerun may take")
+    parser.add_argument("-o", "--output", default="load_report.json")
+    args = parser.parse_args(argv)
+    output = os.path.abspath(args.output)
+
+    # No background reloads while measuring
+    os.environ.setdefault("RADIX_RELOAD_INTERVAL", "0")
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app opens strokes1.json (and writes its index caches) in the working directory
+        json_path = os.path.join(tmp, "strokes1.json")
+        if args.data:
+            os.symlink(os.path.abspath(args.data), json_path)
+        else:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(synth_data.generate(args.size, args.seed), f, ensure_ascii=False)
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            result = run_load(json_path, args)
+        finally:
+            os.chdir(cwd)
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "dataset": os.path.basename(args.data) if args.data else f"synthetic_{args.size}",
+        },
+        "result": result,
+    }
+    print_summary(result)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Wrote {output}", file=sys.stderr)
+    return 1 if result["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""Benchmark the explorer's data paths on synthetic or real datasets.
+
+    python benchmarks/run_bench.py run --sizes 10000 50000 100000 -o bench.json
+    python benchmarks/run_bench.py run --data strokes1.json -o bench.json
+    python benchmarks/run_bench.py compare base.json bench.json --threshold 0.1
+
+`run` writes a JSON report with the median time and peak traced memory of
+each phase per dataset. `compare` prints the ratio of two reports phase by
+phase and exits non-zero when any phase got slower than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import compiled_index
+import radix_cards
+import radix_client
+import radix_engine
+import radix_export
+from benchmarks import synth_data
+
+PAGE_SIZE = 50
+SAMPLE_COMPONENTS = 200
+PHRASE_MODES = (None, 2, 4, radix_engine.ANY_POSITION)
+
+def measure(fn, repeat, memory):
+    """Run fn `repeat` times; return timing stats and, optionally, peak traced memory."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    stats = {"seconds": statistics.median(runs), "runs": runs}
+    if memory:
+        tracemalloc.start()
+        fn()
+        stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return stats
+
+def measure_inner(fn, repeat, memory):
+    """Like measure, but fn returns the time of the part worth timing."""
+    runs = [fn() for _ in range(repeat)]
+    stats = {"seconds": statistics.median(runs), "runs": runs}
+    if memory:
+        tracemalloc.start()
+        fn()
+        stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return stats
+
+def sample_components(explorer, rng):
+    """The most popular components plus a random sample of the rest."""
+    comps = list(explorer.component_map)
+    popular = sorted(comps, key=lambda c: len(explorer.component_map.get(c, ())), reverse=True)[:20]
+    return popular + rng.sample(comps, min(SAMPLE_COMPONENTS, len(comps)))
+
+def filter_combinations(facets, rng):
+    combos = [(None, None, None)]
+    for stroke in rng.sample(facets.stroke_options(), min(10, len(facets.stroke_options()))):
+        combos.append((stroke, None, None))
+        for radical in rng.sample(facets.radical_options(stroke), min(3, len(facets.radical_options(stroke)))):
+            combos.append((stroke, radical, None))
+            for idc in facets.idc_options(stroke, radical)[:2]:
+                combos.append((stroke, radical, idc))
+    return combos
+
+def bench_dataset(json_path, repeat, memory, seed=0, workers=None):
+    rng = random.Random(seed)
+    phases = {}
+    char_decomp, _ = radix_engine.load_json_entries(json_path)
+    phases["load_json"] = measure(lambda: radix_engine.load_json_entries(json_path), repeat, memory)
+    phases["build_component_map"] = measure(lambda: radix_engine.build_component_map(char_decomp, 5), repeat, memory)
+    if (workers or os.cpu_count() or 1) > 1:
+        # tracemalloc only sees the parent, so the peak here leaves out the workers
+        phases["build_map_parallel"] = measure(
+            lambda: radix_engine.build_component_map(char_decomp, 5, workers), repeat, memory)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "bench.ridx")
+        phases["compile_index"] = measure(lambda: compiled_index.compile_index(json_path, index_path), repeat, memory)
+        phases["open_index"] = measure(lambda: compiled_index.CompiledIndex(index_path), repeat, memory)
+        explorer = radix_engine.Explorer.load(json_path)
+        phases["load_derived"] = measure(lambda: compiled_index.load_derived(explorer.index), repeat, memory)
+
+        phases["facet_index"] = measure(lambda: radix_engine.FacetIndex(explorer.store, explorer.component_map), repeat, memory)
+        phases["compound_index"] = measure(lambda: radix_engine.CompoundIndex(explorer.char_decomp), repeat, memory)
+        combos = filter_combinations(explorer.facets, rng)
+        comps = sample_components(explorer, rng)
+
+        def component_filters():
+            # Fresh index each run so every option list is computed cold, as on a first rerun
+            facets = radix_engine.FacetIndex(explorer.store, explorer.component_map)
+            start = time.perf_counter()
+            for stroke, radical, idc in combos:
+                facets.stroke_options()
+                facets.radical_options(stroke)
+                facets.idc_options(stroke, radical)
+                facets.filtered_components(stroke, radical, idc)
+            return time.perf_counter() - start
+        phases["component_filters"] = measure_inner(component_filters, repeat, memory)
+
+        def result_filters():
+            facets = explorer.facets
+            for comp in comps:
+                idcs, radicals = facets.result_options(comp)
+                for phrases in PHRASE_MODES:
+                    explorer.results(comp, phrases=phrases)
+                explorer.results(comp, radical=radicals[0] if radicals else None, idc=idcs[0] if idcs else None)
+        phases["result_filters"] = measure(result_filters, repeat, memory)
+
+        def multi_queries():
+            # Fresh bitsets each run; the popular components are the expensive operands
+            explorer.__dict__.pop("members", None)
+            popular = comps[:20]
+            for a, b, c in zip(popular, popular[1:], popular[2:]):
+                explorer.query([a, b], none_of=[c])
+                explorer.query(any_of=[a, b], none_of=[c], phrases=2)
+        phases["multi_query"] = measure(multi_queries, repeat, memory)
+
+        phases["text_index"] = measure(lambda: radix_engine.TextIndex(explorer.char_decomp), repeat, memory)
+        text_queries = ["shui", "mu4", "tree", "water tree", "zh", "li3", "mother"]
+        explorer.text_index
+        phases["text_search"] = measure(lambda: [explorer.search_text(q) for q in text_queries], repeat, memory)
+
+        phases["rank_index"] = measure(
+            lambda: radix_engine.RankIndex(explorer.store, explorer.char_decomp, explorer.compounds), repeat, memory)
+
+        def result_orders():
+            for comp in comps:
+                chars = explorer.results(comp)
+                for order in radix_engine.RESULT_ORDERS:
+                    explorer.ordered(chars, order, limit=PAGE_SIZE)
+        phases["result_orders"] = measure(result_orders, repeat, memory)
+
+        def depth_views():
+            for comp in comps:
+                explorer.results(comp, depth=1)
+                explorer.results_by_depth(comp)
+        phases["depth_views"] = measure(depth_views, repeat, memory)
+        # A shallower max_depth served from the same compiled index
+        phases["depth_view_load"] = measure(
+            lambda: radix_engine.DepthView(explorer.index.component_map, 3 + 2), repeat, memory)
+
+        def card_render():
+            for comp in comps:
+                chars = explorer.ordered(explorer.results(comp, phrases=2), limit=PAGE_SIZE)
+                "".join(
+                    radix_cards.char_card_html(char, radix_cards.char_labels(explorer, char)[0],
+                                               explorer.compounds_for(char, 2), f"2-Character Phrases for {char}")
+                    for char in chars
+                )
+        phases["card_render"] = measure(card_render, repeat, memory)
+        def client_payload():
+            # Built once per result set for the browser component, then JSON-encoded per session
+            for comp in comps:
+                chars = explorer.results(comp)
+                if len(chars) <= radix_client.MAX_ROWS:
+                    json.dumps(radix_client.result_payload(explorer, chars), ensure_ascii=False)
+        phases["client_payload"] = measure(client_payload, repeat, memory)
+        def full_export():
+            # Peak memory should stay near one row's worth, whatever the dataset size
+            with open(os.devnull, "w", encoding="utf-8") as out:
+                radix_export.write_export(explorer, explorer.char_decomp, "CSV", out, 2)
+        phases["full_export"] = measure(full_export, repeat, memory)
+        phases["label_cache"] = measure(
+            lambda: {char: radix_cards.char_labels(explorer, char) for char in explorer.component_map}, 1, memory)
+        result = {
+            "characters": len(char_decomp),
+            "components": len(explorer.component_map),
+            "memberships": sum(len(chars) for chars in explorer.component_map.values()),
+            "phases": phases,
+        }
+        explorer.index.close()
+    return result
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+        },
+        "datasets": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        datasets = [(os.path.basename(path), path) for path in args.data]
+        for size in args.sizes if not args.data else ():
+            path = os.path.join(tmp, f"synthetic_{size}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(synth_data.generate(size, args.seed), f, ensure_ascii=False)
+            datasets.append((f"synthetic_{size}", path))
+        for name, path in datasets:
+            print(f"Benchmarking {name} ...", file=sys.stderr)
+            result = bench_dataset(path, args.repeat, not args.no_memory, args.seed, args.workers or None)
+            report["datasets"][name] = result
+            for phase, stats in result["phases"].items():
+                peak = f"{stats['peak_bytes'] / 2**20:9.1f} MiB" if "peak_bytes" in stats else ""
+                print(f"  {phase:<22}{stats['seconds'] * 1000:10.1f} ms {peak}", file=sys.stderr)
+    report["meta"]["max_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+def compare(args):
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"base {base['meta'].get('revision')} -> new {new['meta'].get('revision')}")
+    regressions = 0
+    for name, dataset in new["datasets"].items():
+        base_phases = base["datasets"].get(name, {}).get("phases", {})
+        print(f"\n{name}")
+        print(f"  {'phase':<22}{'base ms':>10}{'new ms':>10}{'ratio':>8}  {'peak MiB':>17}")
+        for phase, stats in dataset["phases"].items():
+            if phase not in base_phases:
+                print(f"  {phase:<22}{'—':>10}{stats['seconds'] * 1000:10.1f}")
+                continue
+            old = base_phases[phase]
+            ratio = stats["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+            flag = ""
+            if ratio > 1 + args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            elif ratio < 1 - args.threshold:
+                flag = "  faster"
+            memory = ""
+            if "peak_bytes" in stats and "peak_bytes" in old:
+                memory = f"{old['peak_bytes'] / 2**20:8.1f}→{stats['peak_bytes'] / 2**20:<8.1f}"
+            print(f"  {phase:<22}{old['seconds'] * 1000:10.1f}{stats['seconds'] * 1000:10.1f}{ratio:8.2f}  {memory:>17}{flag}")
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the explorer's data paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="benchmark and write a report")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    run_parser.add_argument("--data", nargs="+", default=[], help="real datasets instead of synthetic ones")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--workers", type=int, default=0, help="processes for the parallel build (0: one per CPU)")
+    run_parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    run_parser.add_argument("-o", "--output", default="bench_report.json")
+    compare_parser = commands.add_parser("compare", help="compare two reports")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown to flag")
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Generate synthetic datasets in the strokes1.json schema for benchmarking.
+
+The shape mimics the real data: a few hundred primitive components that
+everything else is built from (with a heavy-tailed popularity, so a handful
+of components like 口 or 木 end up in thousands of characters), long
+decomposition chains, 2-4 character compound lists, and a sprinkling of
+'?' decompositions and cycles.
+
+    python benchmarks/synth_data.py --size 50000 -o /tmp/strokes_50k.json
+"""
+import argparse
+import json
+import random
+
+IDCS = "⿰⿱⿲⿳⿴⿵⿶⿷⿸⿹⿺⿻"
+# Codepoint ranges the app accepts as components, then extension blocks it
+# does not (those characters can still have entries of their own)
+CODEPOINT_RANGES = [
+    (0x2E80, 0x2EFF), (0x4E00, 0x9FFF), (0x3400, 0x4DBF), (0x20000, 0x2A6DF),
+    (0x2A700, 0x2EBEF), (0x30000, 0x3134F),
+]
+INITIALS = ["", "b", "p", "m", "f", "d", "t", "n", "l", "g", "k", "h", "j", "q", "x", "zh", "ch", "sh", "r", "z", "c", "s", "y", "w"]
+FINALS = ["a", "o", "e", "i", "u", "ü", "ai", "ei", "ao", "ou", "an", "en", "ang", "eng", "ong", "ia", "ie", "iao", "iu", "ian", "in", "ing", "ua", "uo", "uai", "ui", "uan", "un"]
+TONE_MARKS = {"a": "āáǎà", "o": "ōóǒò", "e": "ēéěè", "i": "īíǐì", "u": "ūúǔù", "ü": "ǖǘǚǜ"}
+WORDS = ["tree", "wood", "water", "mouth", "heart", "person", "woman", "hand", "fire", "earth", "metal", "sun",
+         "moon", "mountain", "river", "rain", "grass", "bamboo", "silk", "gold", "jade", "stone", "horse", "bird",
+         "fish", "insect", "dog", "ox", "sheep", "pig", "word", "speech", "walk", "stop", "eye", "ear", "foot",
+         "cover", "roof", "door", "field", "knife", "bow", "arrow", "cart", "boat", "rice", "grain", "clothing",
+         "disease", "spirit", "ghost", "big", "small", "long", "high", "white", "black", "red", "green", "old"]
+
+def codepoints():
+    for start, end in CODEPOINT_RANGES:
+        yield from range(start, end + 1)
+
+def syllable(rng):
+    final = rng.choice(FINALS)
+    vowel = next((v for v in "aoe" if v in final), None) or final[-1]
+    tone = rng.randrange(5)
+    if tone and vowel in TONE_MARKS:
+        final = final.replace(vowel, TONE_MARKS[vowel][tone - 1], 1)
+    return rng.choice(INITIALS) + final
+
+def definition(rng):
+    return "; ".join(" ".join(rng.sample(WORDS, rng.randint(1, 2))) for _ in range(rng.randint(1, 3)))
+
+def generate(size, seed=0, primitives=300, chain_bias=0.35, bad_rate=0.002, cycle_rate=0.0002):
+    """Return a list of strokes1.json-style entries."""
+    rng = random.Random(seed)
+    chars = [chr(cp) for cp, _ in zip(codepoints(), range(size))]
+    valid_count = sum(end - start + 1 for start, end in CODEPOINT_RANGES[:4])
+    strokes = {}
+    radicals = {}
+    # Zipf-like weights make a few primitives very common
+    weights = [1.0 / (rank + 1) for rank in range(primitives)]
+    entries = []
+    for i, char in enumerate(chars):
+        entry = {"character": char, "pinyin": syllable(rng), "definition": definition(rng)}
+        if i < primitives:
+            strokes[char] = rng.randint(1, 6)
+            radicals[char] = char
+            decomposition = char if rng.random() < 0.5 else ""
+        else:
+            pool_end = min(i, valid_count)
+            parts = []
+            for _ in range(rng.choice((2, 2, 2, 3))):
+                if rng.random() < chain_bias and pool_end > primitives:
+                    # Recently built characters give long decomposition chains
+                    part = chars[rng.randrange(max(primitives, pool_end - 200), pool_end)]
+                elif rng.random() < 0.5:
+                    part = rng.choices(chars[:primitives], weights)[0]
+                else:
+                    part = chars[rng.randrange(pool_end)]
+                parts.append(part)
+            if rng.random() < cycle_rate and i + 1 < min(size, valid_count):
+                parts.append(chars[rng.randrange(i + 1, min(size, valid_count))])
+            strokes[char] = min(sum(strokes.get(p, 4) for p in parts), 40)
+            radicals[char] = radicals.get(parts[0], parts[0])
+            idc = rng.choice(IDCS[:4] if len(parts) == 2 else IDCS[2:4])
+            decomposition = ("?" if rng.random() < bad_rate else "") + idc + "".join(parts)
+        entry["strokes"] = strokes[char]
+        entry["radical"] = radicals[char]
+        entry["decomposition"] = decomposition
+        entry["etymology"] = {
+            "hint": f"{rng.choice(['Pictograph', 'Ideograph', 'Phonosemantic compound'])} of {rng.choice(WORDS)}",
+            "details": definition(rng) if rng.random() < 0.4 else "",
+        }
+        entries.append(entry)
+    popular = chars[:min(size, 3000)]
+    for entry in entries:
+        compounds = []
+        for _ in range(rng.choice((0, 1, 2, 4, 8, 12, 20, 30))):
+            phrase = [rng.choice(popular) for _ in range(rng.choice((2, 2, 2, 3, 4, 4)) - 1)]
+            phrase.insert(rng.randrange(len(phrase) + 1) if rng.random() < 0.3 else 0, entry["character"])
+            compounds.append("".join(phrase))
+        entry["compounds"] = compounds
+    return entries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic strokes1.json.")
+    parser.add_argument("--size", type=int, default=10000, help="number of characters")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="strokes1.json")
+    args = parser.parse_args(argv)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(generate(args.size, args.seed), f, ensure_ascii=False)
+    print(f"Wrote {args.size} characters to {args.output}")
+
+if __name__ == "__main__":
+    main()
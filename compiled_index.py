@@ -0,0 +1,451 @@
+"""Compiled, memory-mapped form of strokes1.json.
+
+strokes1.json stays the source of truth. `compile_index` turns it into a
+single binary file of fixed-width columns, string tables and the precomputed
+component map; `open_index` maps that file read-only so every worker process
+shares the same pages, recompiling first when the cache key (the JSON content
+hash plus CODE_VERSION) changed, a section fails its checksum or the file was
+compiled for a smaller max_depth; one compiled for a larger one serves the
+smaller setting too. The derived query indexes are pickled next to it by
+`save_derived`, one file per max_depth they were built for, and read back by
+`load_derived` under the same key.
+
+Usage: python compiled_index.py strokes1.json [-o strokes1.ridx] [--max-depth 5] [--workers 4]
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections.abc import Mapping
+
+import radix_engine
+from radix_engine import IDC_CHARS, IDC_ORDER, load_json_entries
+
+MAGIC = b"RADIXIDX"
+FORMAT_VERSION = 3
+HEADER = struct.Struct("<8sII32sBxxxI")
+# name, offset, length and the SHA-256 of the section's bytes
+SECTION = struct.Struct("<8sQQ32s")
+NO_STRING = 0xFFFFFFFF
+
+# String fields -> column name (section names are at most 8 bytes)
+STRING_FIELDS = {"pinyin": "pinyin", "definition": "defn", "radical": "radical", "decomposition": "decomp"}
+# Bits of the per-entry `fields` column: which canonical fields are present
+FIELD_BITS = {name: 1 << i for i, name in enumerate(tuple(STRING_FIELDS) + ("strokes", "etymology", "compounds"))}
+
+logger = logging.getLogger("radix.cache")
+
+# Hash of the code that builds cached data, so editing it invalidates the cache
+def _code_version():
+    digest = hashlib.sha256()
+    for module_path in (radix_engine.__file__, __file__):
+        with open(module_path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+CODE_VERSION = _code_version()
+
+DERIVED_MAGIC = b"RADIXDRV"
+DERIVED_HEADER = struct.Struct("<8sI32s32s")
+
+def default_index_path(json_path):
+    return os.path.splitext(json_path)[0] + ".ridx"
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+def cache_key(json_path):
+    """Digest of json_path's content and CODE_VERSION; max_depth is stored beside it."""
+    return hashlib.sha256(file_digest(json_path) + CODE_VERSION.encode("ascii")).digest()
+
+def derived_path(index_path, max_depth):
+    # One file per setting, so sessions on different max_depths sharing an
+    # index don't keep overwriting each other's
+    return f"{index_path}.depth{max_depth}.derived"
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.offsets = array("I", [0])
+        self.data = bytearray()
+
+    def add(self, text):
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.offsets) - 1
+            self.data += text.encode("utf-8")
+            self.offsets.append(len(self.data))
+        return string_id
+
+def _split_entry(entry, strings):
+    """Return (present bits, column values, extras) for one JSON entry."""
+    present = 0
+    values = {}
+    extras = {}
+    for key, value in entry.items():
+        if key == "character":
+            continue
+        if key in STRING_FIELDS and isinstance(value, str):
+            values[key] = strings.add(value)
+        elif key == "strokes" and type(value) is int and -2**31 < value < 2**31:
+            values[key] = value
+        elif (key == "etymology" and isinstance(value, dict) and value
+              and set(value) <= {"hint", "details"} and all(isinstance(v, str) for v in value.values())):
+            values["hint"] = strings.add(value["hint"]) if "hint" in value else NO_STRING
+            values["details"] = strings.add(value["details"]) if "details" in value else NO_STRING
+        elif key == "compounds" and isinstance(value, list) and all(isinstance(v, str) for v in value):
+            values[key] = [strings.add(v) for v in value]
+        else:
+            extras[key] = value
+            continue
+        present |= FIELD_BITS[key]
+    return present, values, extras
+
+def compile_index(json_path, index_path=None, max_depth=5, digest=None, workers=1):
+    """Compile json_path into index_path, replacing any existing file atomically."""
+    index_path = index_path or default_index_path(json_path)
+    digest = digest or cache_key(json_path)
+    char_decomp, invalid = load_json_entries(json_path)
+    component_map, cycles = radix_engine.build_component_map(char_decomp, max_depth, workers)
+
+    strings = _StringTable()
+    columns = {
+        "chars": array("I"), "fields": array("H"), "strokes": array("i"), "idc": array("B"),
+        "pinyin": array("I"), "defn": array("I"), "radical": array("I"), "decomp": array("I"),
+        "hint": array("I"), "details": array("I"), "cmpoffs": array("I", [0]), "cmpids": array("I"),
+    }
+    extras = {}
+    entry_ids = {}
+    for entry_id, (char, entry) in enumerate(char_decomp.items()):
+        entry_ids[char] = entry_id
+        present, values, entry_extras = _split_entry(entry, strings)
+        if entry_extras:
+            extras[entry_id] = entry_extras
+        decomposition = entry.get("decomposition", "")
+        columns["chars"].append(ord(char))
+        columns["fields"].append(present)
+        columns["strokes"].append(values.get("strokes", 0))
+        columns["idc"].append(IDC_ORDER.index(decomposition[0]) + 1
+                              if isinstance(decomposition, str) and decomposition[:1] in IDC_CHARS else 0)
+        for field, column in STRING_FIELDS.items():
+            columns[column].append(values.get(field, NO_STRING))
+        columns["hint"].append(values.get("hint", NO_STRING))
+        columns["details"].append(values.get("details", NO_STRING))
+        columns["cmpids"].extend(values.get("compounds", ()))
+        columns["cmpoffs"].append(len(columns["cmpids"]))
+
+    char_order = sorted(range(len(columns["chars"])), key=columns["chars"].__getitem__)
+    columns["charkeys"] = array("I", (columns["chars"][i] for i in char_order))
+    columns["charsort"] = array("I", char_order)
+
+    comp_keys = array("I", (ord(comp) for comp in component_map))
+    comp_order = sorted(range(len(comp_keys)), key=comp_keys.__getitem__)
+    columns["compkeys"] = comp_keys
+    columns["compsrtk"] = array("I", (comp_keys[i] for i in comp_order))
+    columns["compsrti"] = array("I", comp_order)
+    columns["compoffs"] = array("I", [0])
+    columns["compmem"] = array("I")
+    # One containment depth byte per compmem entry
+    columns["compdep"] = bytearray()
+    for comp, members in component_map.items():
+        columns["compmem"].extend(entry_ids[char] for char in members)
+        columns["compdep"] += component_map.member_depths(comp)
+        columns["compoffs"].append(len(columns["compmem"]))
+
+    columns["stroffs"] = strings.offsets
+    columns["strdata"] = bytes(strings.data)
+    columns["meta"] = json.dumps({
+        "invalid_decompositions": invalid,
+        "cycles": cycles,
+        "extras": extras,
+    }, ensure_ascii=False).encode("utf-8")
+    _write_sections(index_path, digest, max_depth, columns)
+    return index_path
+
+def _write_sections(index_path, digest, max_depth, columns):
+    blobs = [(name.encode("ascii"), value.tobytes() if isinstance(value, array) else bytes(value))
+             for name, value in columns.items()]
+    offset = HEADER.size + SECTION.size * len(blobs)
+    directory = []
+    for name, blob in blobs:
+        offset += -offset % 8
+        directory.append(SECTION.pack(name, offset, len(blob), hashlib.sha256(blob).digest()))
+        offset += len(blob)
+    directory_dir = os.path.dirname(os.path.abspath(index_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, max_depth, digest,
+                                sys.byteorder == "little", len(blobs)))
+            f.writelines(directory)
+            for name, blob in blobs:
+                f.write(b"\0" * (-f.tell() % 8))
+                f.write(blob)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+class _Entry(Mapping):
+    """Read-only view of one character, shaped like its strokes1.json entry."""
+    __slots__ = ("_index", "_id")
+
+    def __init__(self, index, entry_id):
+        self._index = index
+        self._id = entry_id
+
+    def _keys(self):
+        index, entry_id = self._index, self._id
+        present = index._fields[entry_id]
+        keys = ["character"] + [name for name, bit in FIELD_BITS.items() if present & bit]
+        return keys + list(index._extras.get(entry_id, ()))
+
+    def __getitem__(self, key):
+        index, entry_id = self._index, self._id
+        if key == "character":
+            return chr(index._chars[entry_id])
+        bit = FIELD_BITS.get(key)
+        if bit is None or not index._fields[entry_id] & bit:
+            return index._extras.get(entry_id, {})[key]
+        if key == "strokes":
+            return index._strokes[entry_id]
+        if key == "etymology":
+            etymology = {}
+            for name in ("hint", "details"):
+                string_id = index._columns[name][entry_id]
+                if string_id != NO_STRING:
+                    etymology[name] = index.string(string_id)
+            return etymology
+        if key == "compounds":
+            offsets = index._cmpoffs
+            return [index.string(s) for s in index._cmpids[offsets[entry_id]:offsets[entry_id + 1]]]
+        return index.string(index._columns[STRING_FIELDS[key]][entry_id])
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+class CharDecomp(Mapping):
+    """char -> entry facade over a CompiledIndex, iterating in source order."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __getitem__(self, char):
+        return _Entry(self._index, self._index.entry_id(char))
+
+    def __contains__(self, char):
+        return self._index.entry_id(char, None) is not None
+
+    def __iter__(self):
+        return (chr(cp) for cp in self._index._chars)
+
+    def __len__(self):
+        return len(self._index._chars)
+
+class ComponentMap(Mapping):
+    """component -> [characters containing it] facade over a CompiledIndex."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def _position(self, comp):
+        if not isinstance(comp, str) or len(comp) != 1:
+            return None
+        keys = self._index._compsrtk
+        cp = ord(comp)
+        i = bisect.bisect_left(keys, cp)
+        if i < len(keys) and keys[i] == cp:
+            return self._index._compsrti[i]
+        return None
+
+    def __getitem__(self, comp):
+        position = self._position(comp)
+        if position is None:
+            raise KeyError(comp)
+        index = self._index
+        offsets, chars = index._compoffs, index._chars
+        return [chr(chars[i]) for i in index._compmem[offsets[position]:offsets[position + 1]]]
+
+    def member_depths(self, comp):
+        position = self._position(comp)
+        if position is None:
+            raise KeyError(comp)
+        offsets = self._index._compoffs
+        return self._index._compdep[offsets[position]:offsets[position + 1]]
+
+    def __contains__(self, comp):
+        return self._position(comp) is not None
+
+    def __iter__(self):
+        return (chr(cp) for cp in self._index._compkeys)
+
+    def __len__(self):
+        return len(self._index._compkeys)
+
+class CompiledIndex:
+    """A read-only, memory-mapped compiled index file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except (struct.error, KeyError, TypeError, ValueError) as e:
+            self.close()
+            raise ValueError(f"Corrupt compiled index {path}: {e}") from e
+        self.char_decomp = CharDecomp(self)
+        self.component_map = ComponentMap(self)
+
+    def _parse(self):
+        view = memoryview(self._mmap)
+        magic, version, self.max_depth, self.source_digest, little_endian, count = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("unknown format")
+        if bool(little_endian) != (sys.byteorder == "little"):
+            raise ValueError("compiled on a machine with different byte order")
+        sections = {}
+        for i in range(count):
+            name, offset, length, checksum = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+            name = name.rstrip(b"\0").decode("ascii")
+            if offset + length > len(view):
+                raise ValueError(f"section {name!r} is truncated")
+            if hashlib.sha256(view[offset:offset + length]).digest() != checksum:
+                raise ValueError(f"section {name!r} fails its checksum")
+            sections[name] = view[offset:offset + length]
+        typecodes = {"fields": "H", "strokes": "i", "idc": "B", "strdata": "B", "meta": "B", "compdep": "B"}
+        self._columns = {name: section.cast(typecodes.get(name, "I"))
+                         for name, section in sections.items()}
+        for name in ("chars", "fields", "strokes", "idc", "charkeys", "charsort", "cmpoffs", "cmpids",
+                     "compkeys", "compsrtk", "compsrti", "compoffs", "compmem", "compdep", "stroffs", "strdata"):
+            setattr(self, "_" + name, self._columns[name])
+        self.meta = json.loads(bytes(sections["meta"]).decode("utf-8"))
+        self._extras = {int(k): v for k, v in self.meta.pop("extras").items()}
+
+    def close(self):
+        self._columns = {}
+        for name in [name for name, value in vars(self).items() if isinstance(value, memoryview)]:
+            delattr(self, name)
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping goes away with it
+
+    def string(self, string_id):
+        offsets = self._stroffs
+        return bytes(self._strdata[offsets[string_id]:offsets[string_id + 1]]).decode("utf-8")
+
+    def entry_id(self, char, *default):
+        keys = self._charkeys
+        if isinstance(char, str) and len(char) == 1:
+            cp = ord(char)
+            i = bisect.bisect_left(keys, cp)
+            if i < len(keys) and keys[i] == cp:
+                return self._charsort[i]
+        if default:
+            return default[0]
+        raise KeyError(char)
+
+def open_index(json_path, index_path=None, max_depth=5, workers=1):
+    """Map the compiled index for json_path, recompiling it if stale or unreadable."""
+    start = time.perf_counter()
+    index_path = index_path or default_index_path(json_path)
+    digest = cache_key(json_path)
+    try:
+        index = CompiledIndex(index_path)
+    except OSError:
+        index = None
+        reason = "missing"
+    except ValueError as e:
+        index = None
+        reason = str(e)
+    if index is not None:
+        if index.source_digest == digest and index.max_depth >= max_depth:
+            logger.info("compiled index hit: %s in %.3f s", index_path, time.perf_counter() - start)
+            return index
+        index.close()
+        reason = "stale"
+    compile_index(json_path, index_path, max_depth, digest, workers)
+    index = CompiledIndex(index_path)
+    logger.info("compiled index miss (%s): rebuilt %s in %.3f s", reason, index_path, time.perf_counter() - start)
+    return index
+
+def save_derived(index, structures, path=None, max_depth=None):
+    """Pickle {name: index structure} beside the compiled index, atomically.
+
+    max_depth is the setting the structures were built for (default: the
+    index's own). The payload's SHA-256 is stored in the header so
+    load_derived can tell a truncated or corrupted file from a good one.
+    """
+    max_depth = index.max_depth if max_depth is None else max_depth
+    path = path or derived_path(index.path, max_depth)
+    payload = pickle.dumps({"max_depth": max_depth, "structures": structures}, pickle.HIGHEST_PROTOCOL)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(DERIVED_HEADER.pack(DERIVED_MAGIC, FORMAT_VERSION, index.source_digest,
+                                        hashlib.sha256(payload).digest()))
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def load_derived(index, path=None, max_depth=None):
+    """The structures save_derived stored for this index and max_depth, or None if missing, stale or corrupt."""
+    start = time.perf_counter()
+    max_depth = index.max_depth if max_depth is None else max_depth
+    path = path or derived_path(index.path, max_depth)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, digest, checksum = DERIVED_HEADER.unpack_from(data)
+        if magic != DERIVED_MAGIC or version != FORMAT_VERSION:
+            raise ValueError("unknown format")
+        if digest != index.source_digest:
+            raise ValueError("stale")
+        payload = memoryview(data)[DERIVED_HEADER.size:]
+        if hashlib.sha256(payload).digest() != checksum:
+            raise ValueError("checksum mismatch")
+        saved = pickle.loads(payload)
+        if saved["max_depth"] != max_depth:
+            raise ValueError("stale")
+    except FileNotFoundError:
+        logger.info("derived indexes miss (missing): %s", path)
+        return None
+    except Exception as e:
+        logger.info("derived indexes miss (%s): %s", e, path)
+        return None
+    logger.info("derived indexes hit: %s in %.3f s", path, time.perf_counter() - start)
+    return saved["structures"]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile strokes1.json into a memory-mapped index.")
+    parser.add_argument("json_path", nargs="?", default="strokes1.json")
+    parser.add_argument("-o", "--output", help="index file (default: <json_path>.ridx)")
+    parser.add_argument("--max-depth", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="processes for the component map (0: one per CPU)")
+    args = parser.parse_args(argv)
+    path = compile_index(args.json_path, args.output, args.max_depth, workers=args.workers or None)
+    index = CompiledIndex(path)
+    print(f"Wrote {path}: {len(index.char_decomp)} characters, "
+          f"{len(index.component_map)} components, {os.path.getsize(path)} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Option labels and card HTML for the explorer, kept free of Streamlit."""
+
+def char_labels(explorer, char):
+    """Return (display fields, full option label, short option label) for a character."""
+    fields = explorer.fields(char)
+    label = f"{char} (" + ", ".join(f"{k}: {v}" for k, v in fields.items()) + ")"
+    short_label = f"{char} ({fields['Pinyin']}, {fields['Strokes']} strokes)"
+    return fields, label, short_label
+
+def card_details(fields):
+    details = dict(fields, Strokes=f"{fields['Strokes']} strokes")
+    return " ".join(f"<strong>{k}:</strong> {v}" for k, v in details.items())
+
+def char_card_html(char, fields, compounds=(), compounds_title=""):
+    html = f"<div class='char-card'><h3 class='char-title'>{char}</h3><p class='details'>{card_details(fields)}</p>"
+    if compounds:
+        compounds_text = " ".join(sorted(compounds))
+        html += f"<div class='compounds-section'><p class='compounds-title'>{compounds_title}:</p><p class='compounds-list'>{compounds_text}</p></div>"
+    return html + "</div>"
+
+def selected_card_html(char, fields):
+    return f"<div class='selected-card'><h2 class='selected-char'>{char}</h2><p class='details'>{card_details(fields)}</p></div>"
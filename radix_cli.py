@@ -0,0 +1,193 @@
+"""Batch queries against the Radix engine, without the Streamlit UI.
+
+Each input line is a component (e.g. 木) or a JSON object such as
+{"component": "氵", "radical": "水", "idc": "⿰", "mode": "2", "order": "pinyin"}; per-line
+keys override the command-line filters. Objects may instead combine
+components with "all_of", "any_of" and "none_of" lists, e.g.
+{"all_of": ["氵", "口"], "none_of": ["木"]}, or search by structure with an
+IDS pattern such as {"pattern": "⿰亻⿱??"}, or look characters up by reading
+or meaning with {"text": "shui"} or {"text": "tree"}. Component queries
+take "depth" to keep only characters containing the component at most that
+many decomposition steps down (1: directly) and "by_depth" to group results
+by depth. One JSON result is written per line; a line that is not valid
+JSON or has a bad value gets {"line": <number>, "error": ...} and the batch
+carries on.
+
+    python radix_cli.py query components.txt --mode 2 > results.jsonl
+    echo 木 | python radix_cli.py query --depth 1
+    echo 木 | python radix_cli.py query --details
+    python radix_cli.py components --stroke 4 --idc ⿱
+    python radix_cli.py export --format anki --component 氵 -o water.txt
+"""
+import argparse
+import json
+import sys
+
+import radix_engine
+import radix_export
+
+def parse_mode(value):
+    """Phrase mode from "single", "any" or a phrase length."""
+    if value in (None, "", "single"):
+        return None
+    if value == radix_engine.ANY_POSITION:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"mode must be single, {radix_engine.ANY_POSITION} or a phrase length, not {value!r}") from None
+
+def parse_query(line, defaults):
+    if not line.startswith("{"):
+        return dict(defaults, component=line)
+    try:
+        fields = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON: {e}") from None
+    if not isinstance(fields, dict):
+        raise ValueError("expected a JSON object")
+    return dict(defaults, **fields)
+
+def run_queries(explorer, stream, defaults, details=False):
+    """One result per non-blank line; a line that cannot be parsed or run
+    gets an error record instead of ending the batch."""
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield run_query(explorer, parse_query(line, defaults), details)
+        except (TypeError, ValueError) as e:
+            yield {"line": number, "error": str(e)}
+
+def run_query(explorer, query, details=False):
+    phrases = parse_mode(query.get("mode"))
+    if query.get("pattern"):
+        pattern = query["pattern"]
+        try:
+            chars = explorer.structure_search(pattern, radical=query.get("radical"), idc=query.get("idc"), phrases=phrases)
+        except ValueError as e:
+            return {"pattern": pattern, "error": str(e)}
+        return dict(pattern=pattern, **format_results(explorer, chars, phrases, details, query.get("order")))
+    if query.get("text"):
+        # Ranked by match quality, so skip format_results' stroke-count sort
+        chars = explorer.search_text(query["text"], limit=query.get("limit", 50))
+        results = [dict(explorer.fields(char), character=char) for char in chars] if details else chars
+        return {"text": query["text"], "count": len(chars), "results": results}
+    if any(key in query for key in ("all_of", "any_of", "none_of")):
+        operands = {key: list(query.get(key) or ()) for key in ("all_of", "any_of", "none_of")}
+        unknown = [c for comps in operands.values() for c in comps if c not in explorer.component_map]
+        if unknown:
+            return dict(operands, error=f"unknown components: {''.join(unknown)}")
+        chars = explorer.query(**operands, radical=query.get("radical"), idc=query.get("idc"), phrases=phrases)
+        return dict(operands, **format_results(explorer, chars, phrases, details, query.get("order")))
+    comp = query.get("component", "")
+    if comp not in explorer.component_map:
+        return {"component": comp, "error": "unknown component"}
+    if query.get("by_depth"):
+        groups = explorer.results_by_depth(comp, radical=query.get("radical"), idc=query.get("idc"), phrases=phrases)
+        by_depth = {str(depth): format_results(explorer, chars, phrases, details, query.get("order"))
+                    for depth, chars in groups.items()}
+        return {"component": comp, "count": sum(group["count"] for group in by_depth.values()), "by_depth": by_depth}
+    depth = query.get("depth")
+    if depth is not None and (not isinstance(depth, int) or isinstance(depth, bool)):
+        raise ValueError(f"depth must be a whole number, not {depth!r}")
+    chars = explorer.results(comp, radical=query.get("radical"), idc=query.get("idc"), phrases=phrases, depth=depth)
+    return dict(component=comp, **format_results(explorer, chars, phrases, details, query.get("order")))
+
+def format_results(explorer, chars, phrases, details=False, order=None):
+    if order and order not in radix_engine.RESULT_ORDERS:
+        raise ValueError(f"unknown order {order!r}")
+    chars = explorer.ordered(chars, order or "strokes")
+    if details:
+        results = []
+        for char in chars:
+            result = dict(explorer.fields(char), character=char)
+            if phrases is not None:
+                result["Compounds"] = list(explorer.compounds_for(char, phrases))
+            results.append(result)
+    elif phrases is not None:
+        results = [{"character": char, "compounds": list(explorer.compounds_for(char, phrases))} for char in chars]
+    else:
+        results = chars
+    return {"count": len(chars), "results": results}
+
+def write_jsonl(records, out):
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False))
+        out.write("\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the character decomposition engine.")
+    parser.add_argument("--data", default="strokes1.json", help="strokes1.json path")
+    parser.add_argument("--max-depth", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="processes for building the component map (0: one per CPU)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list data-quality warnings")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query", help="characters containing each input component")
+    query.add_argument("input", nargs="?", help="file of components, one per line (default: stdin)")
+    query.add_argument("--radical", help="only results with this radical")
+    query.add_argument("--idc", help="only results whose decomposition starts with this IDC")
+    query.add_argument("--mode", default="single", help="single, any, or a phrase length such as 2")
+    query.add_argument("--details", action="store_true", help="include pinyin, strokes, definition, ...")
+    query.add_argument("--order", default="strokes", choices=list(radix_engine.RESULT_ORDERS), help="result order")
+    query.add_argument("--depth", type=int, help="only characters containing the component at most this many "
+                                                  "decomposition steps down (1: directly)")
+    query.add_argument("--by-depth", action="store_true", help="group each component's results by containment depth")
+
+    listing = commands.add_parser("components", help="list input components matching filters")
+    listing.add_argument("--stroke", type=int)
+    listing.add_argument("--radical")
+    listing.add_argument("--idc")
+
+    export = commands.add_parser("export", help="stream characters as CSV, TSV, JSONL, Anki cards or a compound list")
+    export.add_argument("--format", default="csv", type=str.upper,
+                        choices=[fmt.upper() for fmt in radix_export.FORMATS], help="output format (default: csv)")
+    export.add_argument("--component", help="only characters containing this component (default: every character)")
+    export.add_argument("--radical", help="only results with this radical")
+    export.add_argument("--idc", help="only results whose decomposition starts with this IDC")
+    export.add_argument("--depth", type=int, help="with --component, only characters containing it at most this deep")
+    export.add_argument("--mode", default="single", help="which compounds to include: single (all), any, or a phrase length")
+    export.add_argument("--order", choices=list(radix_engine.RESULT_ORDERS),
+                        help="order of the characters (default: strokes with --component, else source order)")
+    export.add_argument("-o", "--output", help="output file (default: stdout)")
+
+    args = parser.parse_args(argv)
+    explorer = radix_engine.Explorer.load(args.data, args.max_depth, workers=args.workers or None)
+    if args.verbose:
+        for message in explorer.diagnostics:
+            print(f"{message['type']}: {message['message']}", file=sys.stderr)
+    elif explorer.diagnostics:
+        print(f"{len(explorer.diagnostics)} data-quality warnings (use --verbose to list)", file=sys.stderr)
+
+    if args.command == "components":
+        comps = explorer.components(args.stroke, args.radical, args.idc)
+        write_jsonl(({"component": comp, **explorer.fields(comp)} for comp in comps), sys.stdout)
+        return
+
+    if args.command == "export":
+        fmt = next(fmt for fmt in radix_export.FORMATS if fmt.upper() == args.format)
+        phrases = parse_mode(args.mode)
+        if args.component:
+            if args.component not in explorer.component_map:
+                parser.error(f"unknown component {args.component}")
+            chars = explorer.ordered(explorer.results(args.component, radical=args.radical, idc=args.idc, phrases=phrases,
+                                                      depth=args.depth), args.order or "strokes")
+        elif args.order:
+            chars = explorer.ordered(list(explorer.char_decomp), args.order)
+        else:
+            chars = explorer.char_decomp
+        out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+        with out:
+            radix_export.write_export(explorer, chars, fmt, out, phrases)
+        return
+
+    defaults = {"radical": args.radical, "idc": args.idc, "mode": args.mode, "order": args.order,
+                "depth": args.depth, "by_depth": args.by_depth}
+    stream = open(args.input, encoding="utf-8") if args.input else sys.stdin
+    with stream:
+        write_jsonl(run_queries(explorer, stream, defaults, args.details), sys.stdout)
+
+if __name__ == "__main__":
+    main()
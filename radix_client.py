@@ -0,0 +1,63 @@
+"""Result sets packed for the in-browser results component in client_component/.
+
+result_payload gives the component all it needs to filter by IDC, radical
+and Output Type, order, paginate and draw cards with no further server
+round trips: card fields are formatted here, compounds come bucketed by
+length and every RESULT_ORDERS order is a rank per row. Kept free of
+Streamlit like radix_cards.
+"""
+import os
+import radix_engine
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "client_component")
+
+# Larger result sets are left to server-side paging: their payload would
+# cost more to send than the reruns it saves
+MAX_ROWS = 5000
+
+# Row layout; rows are lists rather than dicts to keep the JSON small
+ROW_FIELDS = ["char", "fields", "radical", "idc", "ranks", "compounds", "containing", "depth"]
+
+def result_payload(explorer, chars, depths=None):
+    """A JSON-ready dict describing chars (a result list, in source order).
+
+    fields hold the card's display values in "field_names" order; radical
+    and idc index the "radicals" and "idcs" lists (-1 is none); ranks hold
+    one position per "orders" name (-1 sorts first, as characters without
+    an entry do in RankIndex). compounds map a length to the character's
+    own phrases of that length and containing lists every phrase with the
+    character at any position, both as indexes into "phrases", since most
+    phrases turn up under several of their characters. depth is the
+    containment depth from depths ({char: depth}, for a component's results;
+    -1 without), and "depths" lists the distinct ones.
+    """
+    store, ranks, compounds = explorer.store, explorer.ranks, explorer.compounds
+    orders = list(radix_engine.RESULT_ORDERS)
+    ids = store.ids
+    known = [ids[c] for c in chars if c in ids]
+    radicals = sorted({store.radical_names[store.radical_ids[i]] for i in known} - {""})
+    idcs = sorted({radix_engine.IDC_ORDER[store.idcs[i] - 1] for i in known if store.idcs[i]})
+    radical_index = {radical: n for n, radical in enumerate(radicals)}
+    idc_index = {idc: n for n, idc in enumerate(idcs)}
+    phrase_index = {}
+    def interned(phrases):
+        return [phrase_index.setdefault(phrase, len(phrase_index)) for phrase in phrases]
+    field_names = None
+    rows = []
+    for char in chars:
+        i = ids.get(char)
+        fields = explorer.fields(char)
+        field_names = field_names or list(fields)
+        rows.append([
+            char,
+            list(fields.values()),
+            radical_index.get(store.radical(char), -1),
+            idc_index.get(store.idc(char), -1),
+            [-1 if i is None else ranks.ranks[order][i] for order in orders],
+            {str(n): interned(phrases) for n, phrases in compounds.by_length.get(char, {}).items()},
+            interned(compounds.phrases_containing(char)),
+            -1 if depths is None else depths[char],
+        ])
+    return {"fields": ROW_FIELDS, "field_names": field_names or [], "orders": orders, "radicals": radicals,
+            "idcs": idcs, "depths": sorted(set(depths.values())) if depths else [],
+            "phrases": list(phrase_index), "rows": rows}
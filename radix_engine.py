@@ -0,0 +1,1402 @@
+"""Streamlit-free data loading, indexing and filtering for the Radix explorer.
+
+`Explorer` bundles a loaded strokes1.json with its component map and
+indexes; App1.py and radix_cli.py are both thin clients of it.
+"""
+import bisect
+import heapq
+import json
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from collections import Counter, OrderedDict, defaultdict
+from collections.abc import Mapping
+from functools import cached_property
+
+# Global IDC characters
+IDC_CHARS = {'⿰', '⿱', '⿲', '⿳', '⿴', '⿵', '⿶', '⿷', '⿸', '⿹', '⿺', '⿻'}
+IDC_ARITY = {idc: 3 if idc in ('⿲', '⿳') else 2 for idc in IDC_CHARS}
+# Column code of each IDC is its position here plus one; 0 means none
+IDC_ORDER = sorted(IDC_CHARS)
+WILDCARDS = {'?', '？', '*', '＊'}
+
+def is_valid_char(c):
+    return ('一' <= c <= '鿿' or '⺀' <= c <= '⻿' or '㐀' <= c <= '䶿' or '𠀀' <= c <= '𪛟')
+
+def clean_field(field):
+    return field[0] if isinstance(field, list) and field else field or "—"
+
+def get_etymology_text(entry):
+    etymology = entry.get("etymology", {})
+    hint = clean_field(etymology.get("hint", "No hint available"))
+    details = clean_field(etymology.get("details", ""))
+    return f"{hint}{'; Details: ' + details if details and details != '—' else ''}"
+
+def format_decomposition(entry):
+    """Format the decomposition to show full structure, ignoring invalid components."""
+    decomposition = entry.get("decomposition", "")
+    if not decomposition or '?' in decomposition:
+        return "—"
+    return decomposition
+
+def load_json_entries(json_path):
+    """Read strokes1.json, clearing decompositions that contain '?'.
+
+    Returns (char_decomp, invalid) where invalid lists (char, decomposition)
+    pairs that were cleared, for load-time warnings.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    invalid = []
+    for entry in data:
+        if '?' in entry.get("decomposition", ""):
+            invalid.append((entry["character"], entry["decomposition"]))
+            entry["decomposition"] = ""
+    return {entry["character"]: entry for entry in data}, invalid
+
+def direct_components(char, entry):
+    """Distinct valid components in entry's decomposition, excluding char itself."""
+    decomposition = entry.get("decomposition", "") if entry else ""
+    if not decomposition or '?' in decomposition:
+        return ()
+    return tuple(dict.fromkeys(comp for comp in decomposition if is_valid_char(comp) and comp != char))
+
+def intern_graph(char_decomp):
+    """Intern every character to an integer ID and collect its direct components.
+
+    IDs follow the order of char_decomp, then components that have no entry of
+    their own. Self references (e.g. 木 decomposing to 木) are dropped since a
+    character always contains itself anyway.
+    """
+    chars = list(char_decomp)
+    ids = {char: i for i, char in enumerate(chars)}
+    children = []
+    for char in char_decomp:
+        kids = []
+        for comp in direct_components(char, char_decomp[char]):
+            comp_id = ids.get(comp)
+            if comp_id is None:
+                comp_id = ids[comp] = len(chars)
+                chars.append(comp)
+            kids.append(comp_id)
+        children.append(tuple(kids))
+    children.extend(() for _ in range(len(chars) - len(children)))
+    return chars, ids, children
+
+def strongly_connected_components(children, roots=None):
+    """Iterative Tarjan; yields components children-first (reverse topological order).
+
+    roots limits the search to what is reachable from those IDs.
+    """
+    index = [-1] * len(children)
+    lowlink = [0] * len(children)
+    on_stack = [False] * len(children)
+    stack = []
+    counter = 0
+    for root in range(len(children)) if roots is None else roots:
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            node, pos = work[-1]
+            kids = children[node]
+            if pos < len(kids):
+                work[-1] = (node, pos + 1)
+                kid = kids[pos]
+                if index[kid] == -1:
+                    index[kid] = lowlink[kid] = counter
+                    counter += 1
+                    stack.append(kid)
+                    on_stack[kid] = True
+                    work.append((kid, 0))
+                elif on_stack[kid]:
+                    lowlink[node] = min(lowlink[node], index[kid])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    members.append(member)
+                    if member == node:
+                        break
+                yield members
+
+def _merge_child(depths, child, child_depths, base, limit):
+    if base <= limit and depths.get(child, limit + 1) > base:
+        depths[child] = base
+    for comp, depth in child_depths.items():
+        depth += base
+        if depth <= limit and depths.get(comp, limit + 1) > depth:
+            depths[comp] = depth
+
+def closure_depths(children, limit, roots=None):
+    """Minimum containment depth of every component reachable within `limit` steps.
+
+    Returns (depths, cycles): depths[i] maps component ID -> shortest path
+    length from i, and cycles lists the multi-character decomposition cycles.
+    Each character's closure is computed once from its children's closures;
+    members of a cycle get a bounded BFS inside the cycle instead. With
+    roots, only IDs reachable from them are computed (the rest stay None).
+    """
+    depths = [None] * len(children)
+    cycles = []
+    for members in strongly_connected_components(children, roots):
+        if len(members) == 1:
+            node = members[0]
+            node_depths = {}
+            for kid in children[node]:
+                _merge_child(node_depths, kid, depths[kid], 1, limit)
+            depths[node] = node_depths
+            continue
+        cycles.append(members)
+        member_set = set(members)
+        for start in members:
+            reached = {start: 0}
+            node_depths = {}
+            frontier = [start]
+            level = 0
+            while frontier and level < limit:
+                level += 1
+                next_frontier = []
+                for node in frontier:
+                    for kid in children[node]:
+                        if kid in member_set and kid not in node_depths:
+                            node_depths[kid] = level
+                            if kid not in reached:
+                                reached[kid] = level
+                                next_frontier.append(kid)
+                frontier = next_frontier
+            for node, level in reached.items():
+                for kid in children[node]:
+                    if kid not in member_set:
+                        _merge_child(node_depths, kid, depths[kid], level + 1, limit)
+            depths[start] = node_depths
+    return depths, cycles
+
+# Below this many entries a process pool costs more than it saves
+PARALLEL_MIN_CHARS = 20000
+
+# Containment depths are stored one byte per membership
+MAX_CONTAINMENT_DEPTH = 255
+
+class ContainmentMap(dict):
+    """component -> [characters containing it], in char_decomp order, with
+    components in code point order as in every component map type, so a
+    fresh build and an incrementally patched map list them the same way.
+
+    depths[comp] holds each of those characters' containment depth, in the
+    same order: 0 for the component itself, 1 where it appears in the
+    character's own decomposition, 2 in a component's, and so on. Every
+    component map type offers member_depths(comp) the same way.
+    """
+
+    def __init__(self, component_map=(), depths=None):
+        super().__init__(component_map)
+        self.depths = {} if depths is None else depths
+
+    def member_depths(self, comp):
+        return self.depths[comp]
+
+def sorted_containment_map(members, depths):
+    """A ContainmentMap of members with its keys put in code point order."""
+    return ContainmentMap({comp: members[comp] for comp in sorted(members)}, depths)
+
+def collect_components(chars, depths, char_ids):
+    """Partial component map for the characters char_ids, in that order,
+    as ({comp: [chars]}, {comp: bytearray of depths})."""
+    # Keyed by ID while collecting; ints hash faster than the strings
+    members = defaultdict(list)
+    levels = defaultdict(bytearray)
+    for char_id in char_ids:
+        char = chars[char_id]
+        members[char_id].append(char)
+        levels[char_id].append(0)
+        for comp_id, depth in depths[char_id].items():
+            if comp_id != char_id:
+                members[comp_id].append(char)
+                levels[comp_id].append(depth)
+    return ({chars[comp_id]: row for comp_id, row in members.items()},
+            {chars[comp_id]: row for comp_id, row in levels.items()})
+
+_shard_graph = None
+
+def _init_shard_worker(chars, children, limit):
+    global _shard_graph
+    _shard_graph = chars, children, limit
+
+def _build_shard(bounds):
+    chars, children, limit = _shard_graph
+    char_ids = range(*bounds)
+    depths, _ = closure_depths(children, limit, char_ids)
+    return collect_components(chars, depths, char_ids)
+
+def build_component_map(char_decomp, max_depth=5, workers=1):
+    """Map each component to the characters containing it, in char_decomp order.
+
+    A character contains itself plus every component reachable within
+    max_depth + 2 decomposition steps, which is how far get_all_components
+    reaches when started from each direct component. Returns
+    (component_map, cycles): component_map is a ContainmentMap that also
+    records how many steps down each character contains each component,
+    and cycles are lists of characters.
+
+    With workers > 1 (None for one per CPU) and at least PARALLEL_MIN_CHARS
+    entries, contiguous shards of characters are closed over in a process
+    pool and their partial maps merged in shard order, which gives the same
+    lists as the serial build.
+    """
+    chars, _, children = intern_graph(char_decomp)
+    limit = max_depth + 2
+    if limit > MAX_CONTAINMENT_DEPTH:
+        raise ValueError(f"max_depth {max_depth} is too deep; containment depths must fit in a byte")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(char_decomp) < PARALLEL_MIN_CHARS:
+        depths, cycles = closure_depths(children, limit)
+        component_map, component_depths = collect_components(chars, depths, range(len(char_decomp)))
+        return (sorted_containment_map(component_map, component_depths),
+                [[chars[i] for i in reversed(members)] for members in cycles])
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # Later characters reach deeper, so use more shards than workers to even out the load
+    shard_count = workers * 2
+    bounds = [(len(char_decomp) * i // shard_count, len(char_decomp) * (i + 1) // shard_count)
+              for i in range(shard_count)]
+    # Spawned, not forked: this runs inside the threaded Streamlit server and
+    # the reload watcher, and a forked child can inherit a lock another
+    # thread held at the time
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_shard_worker, initargs=(chars, children, limit)) as pool:
+        shards = pool.map(_build_shard, bounds)
+        # Cycles in the order the serial build reports them, found while the workers run
+        cycles = [members for members in strongly_connected_components(children) if len(members) > 1]
+        component_map, component_depths = {}, {}
+        for shard_map, shard_depths in shards:
+            for comp, members in shard_map.items():
+                if comp in component_map:
+                    component_map[comp].extend(members)
+                    component_depths[comp].extend(shard_depths[comp])
+                else:
+                    component_map[comp] = members
+                    component_depths[comp] = shard_depths[comp]
+    return (sorted_containment_map(component_map, component_depths),
+            [[chars[i] for i in reversed(members)] for members in cycles])
+
+def closure(char, components_of, limit):
+    """{component: containment depth} for char (at depth 0) and every
+    component within `limit` decomposition steps of it.
+
+    components_of(node) returns node's direct components.
+    """
+    found = {char: 0}
+    frontier = [char]
+    for depth in range(1, limit + 1):
+        next_frontier = []
+        for node in frontier:
+            for comp in components_of(node):
+                if comp not in found:
+                    found[comp] = depth
+                    next_frontier.append(comp)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return found
+
+class PatchedComponentMap(Mapping):
+    """A component map with some entries replaced; an empty list removes one.
+
+    patches[comp] is comp's new list of characters and depth_patches[comp]
+    their depths. Patching a PatchedComponentMap merges the patches over the
+    same base, so repeated reloads never stack facades. Added components are
+    merged into the base's code point order, as a rebuild would list them.
+    """
+
+    def __init__(self, base, patches, depth_patches):
+        if isinstance(base, PatchedComponentMap):
+            patches = {**base.patches, **patches}
+            depth_patches = {**base.depth_patches, **depth_patches}
+            base = base.base
+        self.base = base
+        self.patches = patches
+        self.depth_patches = depth_patches
+        self._added = sorted(comp for comp, chars in patches.items() if chars and comp not in base)
+        self._removed = {comp for comp, chars in patches.items() if not chars and comp in base}
+
+    def __getitem__(self, comp):
+        if comp in self.patches:
+            chars = self.patches[comp]
+            if not chars:
+                raise KeyError(comp)
+            return chars
+        return self.base[comp]
+
+    def member_depths(self, comp):
+        if comp in self.patches:
+            if not self.patches[comp]:
+                raise KeyError(comp)
+            return self.depth_patches[comp]
+        return self.base.member_depths(comp)
+
+    def __contains__(self, comp):
+        if comp in self.patches:
+            return bool(self.patches[comp])
+        return comp in self.base
+
+    def __iter__(self):
+        removed = self._removed
+        yield from heapq.merge((comp for comp in self.base if comp not in removed), self._added)
+
+    def __len__(self):
+        return len(self.base) - len(self._removed) + len(self._added)
+
+def update_component_map(component_map, old_decomp, new_decomp, max_depth=5, cycles=(), full_rebuild_share=0.25, workers=1):
+    """Bring component_map from old_decomp up to date with new_decomp.
+
+    Only characters whose decomposition changed, and their ancestors within
+    max_depth + 2 steps, can have a different closure; those closures are
+    recomputed by bounded BFS and the component lists (and depths) they
+    touch are patched in place of a full rebuild. Falls back to build_component_map when entries
+    were reordered or more than full_rebuild_share of them are affected.
+    Returns (component_map, cycles, affected) with affected None after a
+    full rebuild, which uses `workers` processes (see build_component_map).
+    """
+    limit = max_depth + 2
+    changed = old_decomp.keys() ^ new_decomp.keys()
+    changed.update(
+        char for char in new_decomp.keys() & old_decomp.keys()
+        if old_decomp[char].get("decomposition", "") != new_decomp[char].get("decomposition", "")
+    )
+    kept_order = [char for char in new_decomp if char in old_decomp]
+    if kept_order != [char for char in old_decomp if char in new_decomp]:
+        return (*build_component_map(new_decomp, max_depth, workers), None)
+    if not changed:
+        return component_map, list(cycles), set()
+
+    new_components = {char: direct_components(char, entry) for char, entry in new_decomp.items()}
+    parents = defaultdict(list)
+    for char, comps in new_components.items():
+        for comp in comps:
+            parents[comp].append(char)
+    affected = set(changed)
+    frontier = list(changed)
+    for _ in range(limit):
+        next_frontier = []
+        for node in frontier:
+            for parent in parents.get(node, ()):
+                if parent not in affected:
+                    affected.add(parent)
+                    next_frontier.append(parent)
+        frontier = next_frontier
+    if len(affected) > full_rebuild_share * max(len(new_decomp), 1):
+        return (*build_component_map(new_decomp, max_depth, workers), None)
+
+    old_components = {}
+    def old_components_of(char):
+        comps = old_components.get(char)
+        if comps is None:
+            comps = old_components[char] = direct_components(char, old_decomp.get(char))
+        return comps
+    def new_components_of(char):
+        return new_components.get(char, ())
+
+    # Most ancestors keep their closure; only lists that really change are patched
+    removed = defaultdict(set)
+    added = defaultdict(dict)
+    for char in affected:
+        old = closure(char, old_components_of, limit) if char in old_decomp else {}
+        new = closure(char, new_components_of, limit) if char in new_decomp else {}
+        for comp in old.keys() - new.keys():
+            removed[comp].add(char)
+        for comp, depth in new.items():
+            # A character whose depth changed is removed and added back
+            if old.get(comp) != depth:
+                if comp in old:
+                    removed[comp].add(char)
+                added[comp][char] = depth
+    positions = {char: i for i, char in enumerate(new_decomp)}
+    patches = {}
+    depth_patches = {}
+    for comp in removed.keys() | added.keys():
+        gone = removed.get(comp, ())
+        members = []
+        if comp in component_map:
+            members = [(char, depth) for char, depth in zip(component_map[comp], component_map.member_depths(comp))
+                       if char not in gone]
+        for char, depth in added.get(comp, {}).items():
+            bisect.insort(members, (char, depth), key=lambda member: positions[member[0]])
+        patches[comp] = [char for char, _ in members]
+        depth_patches[comp] = bytearray(depth for _, depth in members)
+
+    # Only cycles reachable from a changed character can appear, break or
+    # merge, and each such cycle lies entirely among its descendants
+    below = set(changed)
+    frontier = list(changed)
+    while frontier:
+        frontier = [comp for node in frontier for comp in new_components.get(node, ()) if comp not in below]
+        below.update(frontier)
+    members = [char for char in new_decomp if char in below]
+    ids = {char: i for i, char in enumerate(members)}
+    children = [tuple(ids[c] for c in new_components[char] if c in ids) for char in members]
+    new_cycles = [cycle for cycle in cycles if below.isdisjoint(cycle)]
+    new_cycles.extend(
+        [members[i] for i in reversed(component)]
+        for component in strongly_connected_components(children)
+        if len(component) > 1
+    )
+    return PatchedComponentMap(component_map, patches, depth_patches), new_cycles, affected
+
+class CharStore:
+    """Characters interned to integer IDs, with array columns for the hot fields.
+
+    IDs follow char_decomp order. strokes holds -1 where the count is missing
+    or not an integer, radical_ids index radical_names (0 is no radical) and
+    idcs hold a top-level IDC's IDC_ORDER position plus one (0 is none), so
+    each accessor costs one dict lookup and one array read.
+    """
+
+    def __init__(self, chars, strokes, radical_ids, radical_names, idcs):
+        self.chars = chars
+        self.ids = {char: i for i, char in enumerate(chars)}
+        self.strokes = strokes
+        self.radical_ids = radical_ids
+        self.radical_names = radical_names
+        self.idcs = idcs
+
+    @classmethod
+    def from_entries(cls, char_decomp):
+        strokes, radical_ids, idcs = array("i"), array("I"), array("B")
+        radical_names = [""]
+        interned = {"": 0}
+        for entry in char_decomp.values():
+            stroke = entry.get("strokes", -1)
+            strokes.append(stroke if type(stroke) is int and -2**31 < stroke < 2**31 else -1)
+            radical = entry.get("radical", "")
+            radical = radical if isinstance(radical, str) else ""
+            radical_id = interned.get(radical)
+            if radical_id is None:
+                radical_id = interned[radical] = len(radical_names)
+                radical_names.append(radical)
+            radical_ids.append(radical_id)
+            decomposition = entry.get("decomposition", "")
+            idcs.append(IDC_ORDER.index(decomposition[0]) + 1
+                        if isinstance(decomposition, str) and decomposition[:1] in IDC_CHARS else 0)
+        return cls(list(char_decomp), strokes, radical_ids, radical_names, idcs)
+
+    @classmethod
+    def from_index(cls, index):
+        """Build from a compiled_index.CompiledIndex's columns without visiting entries."""
+        import compiled_index
+        has_strokes = compiled_index.FIELD_BITS["strokes"]
+        has_radical = compiled_index.FIELD_BITS["radical"]
+        fields = index._fields
+        strokes = array("i", (stroke if fields[i] & has_strokes else -1 for i, stroke in enumerate(index._strokes)))
+        radical_names = [""]
+        interned = {}
+        radical_ids = array("I")
+        for i, string_id in enumerate(index._columns["radical"]):
+            if not fields[i] & has_radical:
+                radical_ids.append(0)
+                continue
+            radical_id = interned.get(string_id)
+            if radical_id is None:
+                radical_id = interned[string_id] = len(radical_names)
+                radical_names.append(index.string(string_id))
+            radical_ids.append(radical_id)
+        chars = [chr(cp) for cp in index._chars]
+        return cls(chars, strokes, radical_ids, radical_names, array("B", index._idc))
+
+    def stroke_count(self, char):
+        i = self.ids.get(char)
+        return -1 if i is None else self.strokes[i]
+
+    def radical(self, char):
+        i = self.ids.get(char)
+        return "" if i is None else self.radical_names[self.radical_ids[i]]
+
+    def idc(self, char):
+        i = self.ids.get(char)
+        return "" if i is None or not self.idcs[i] else IDC_ORDER[self.idcs[i] - 1]
+
+class CompactComponentMap(Mapping):
+    """A component map stored CSR-style over a CharStore's IDs.
+
+    Component k's members are store IDs members[offsets[k]:offsets[k + 1]],
+    so the lists cost four bytes per membership instead of a list slot and a
+    string reference; they are decoded to characters on access. depths holds
+    one containment depth byte per membership, beside members.
+    """
+
+    def __init__(self, component_map, store):
+        self.store = store
+        self.comps = list(component_map)
+        self.rows = {comp: k for k, comp in enumerate(self.comps)}
+        self.offsets = array("I", [0])
+        self.members = array("I")
+        self.depths = bytearray()
+        ids = store.ids
+        for comp in self.comps:
+            self.members.extend(ids[char] for char in component_map[comp])
+            self.depths += component_map.member_depths(comp)
+            self.offsets.append(len(self.members))
+
+    def member_ids(self, comp):
+        k = self.rows[comp]
+        return self.members[self.offsets[k]:self.offsets[k + 1]]
+
+    def member_depths(self, comp):
+        k = self.rows[comp]
+        return self.depths[self.offsets[k]:self.offsets[k + 1]]
+
+    def __getitem__(self, comp):
+        chars = self.store.chars
+        return [chars[i] for i in self.member_ids(comp)]
+
+    def __contains__(self, comp):
+        return comp in self.rows
+
+    def __iter__(self):
+        return iter(self.comps)
+
+    def __len__(self):
+        return len(self.comps)
+
+class DepthView(Mapping):
+    """A component map cut down to containment depths of at most `limit`.
+
+    Serves a smaller max_depth from a map built for a larger one (limit is
+    max_depth + 2), so changing the setting needs no rebuild. Components
+    that only occur deeper than limit are left out; the rest keep code point
+    order, as a map built at the smaller setting lists them.
+    """
+
+    def __init__(self, base, limit):
+        self.base = base
+        self.limit = limit
+        self.comps = sorted(comp for comp in base if min(base.member_depths(comp)) <= limit)
+        self.rows = set(self.comps)
+
+    def __getitem__(self, comp):
+        if comp not in self.rows:
+            raise KeyError(comp)
+        limit = self.limit
+        return [char for char, depth in zip(self.base[comp], self.base.member_depths(comp)) if depth <= limit]
+
+    def member_depths(self, comp):
+        if comp not in self.rows:
+            raise KeyError(comp)
+        return bytearray(depth for depth in self.base.member_depths(comp) if depth <= self.limit)
+
+    def __contains__(self, comp):
+        return comp in self.rows
+
+    def __iter__(self):
+        return iter(self.comps)
+
+    def __len__(self):
+        return len(self.comps)
+
+class FacetIndex:
+    """Component IDs grouped by stroke count, radical and top-level IDC.
+
+    IDs are ranks in stroke-count order (ties keep component_map order), so a
+    sorted set of IDs is already the order the selectboxes display. A filter
+    value of None means "no filter". Option lists and counts are memoized per
+    filter combination.
+    """
+
+    def __init__(self, store, component_map):
+        self.component_map = component_map
+        self.comps = sorted(component_map, key=store.stroke_count)
+        self.ids = {comp: i for i, comp in enumerate(self.comps)}
+        self.strokes = []
+        self.radicals = []
+        self.idcs = []
+        self.by_stroke = defaultdict(set)
+        self.by_radical = defaultdict(set)
+        self.by_idc = defaultdict(set)
+        for i, comp in enumerate(self.comps):
+            stroke = store.stroke_count(comp)
+            radical = store.radical(comp)
+            idc = store.idc(comp)
+            self.strokes.append(stroke)
+            self.radicals.append(radical)
+            self.idcs.append(idc)
+            self.by_stroke[stroke].add(i)
+            self.by_radical[radical].add(i)
+            self.by_idc[idc].add(i)
+        self.all_ids = frozenset(range(len(self.comps)))
+        self._matching = {}
+        self._counts = {}
+        self._results = {}
+
+    def __getstate__(self):
+        # Persisted without the component map (see compiled_index.save_derived);
+        # whoever loads it sets component_map again
+        state = dict(vars(self), _matching={}, _counts={}, _results={})
+        del state["component_map"]
+        return state
+
+    def matching(self, stroke=None, radical=None, idc=None):
+        key = (stroke, radical, idc)
+        ids = self._matching.get(key)
+        if ids is None:
+            ids = self.all_ids
+            for value, groups in ((stroke, self.by_stroke), (radical, self.by_radical), (idc, self.by_idc)):
+                if value is not None:
+                    ids = ids & groups.get(value, frozenset())
+            ids = self._matching[key] = frozenset(ids)
+        return ids
+
+    def counts(self, facet, stroke=None, radical=None):
+        """Counter of `facet` values ("stroke", "radical" or "idc") among matching components."""
+        key = (facet, stroke, radical)
+        counts = self._counts.get(key)
+        if counts is None:
+            column = {"stroke": self.strokes, "radical": self.radicals, "idc": self.idcs}[facet]
+            counts = self._counts[key] = Counter(column[i] for i in self.matching(stroke, radical))
+        return counts
+
+    def stroke_options(self):
+        return sorted(s for s in self.counts("stroke") if s != -1)
+
+    def radical_options(self, stroke=None):
+        return sorted(r for r in self.counts("radical", stroke) if r)
+
+    def idc_options(self, stroke=None, radical=None):
+        return sorted(i for i in self.counts("idc", stroke, radical) if i)
+
+    def filtered_components(self, stroke=None, radical=None, idc=None):
+        """Matching components in stroke-count order."""
+        return [self.comps[i] for i in sorted(self.matching(stroke, radical, idc))]
+
+    def result_options(self, comp):
+        """(IDC options, radical options) among the characters containing comp."""
+        options = self._results.get(comp)
+        if options is None:
+            options = self._results[comp] = self.options_for(self.component_map.get(comp, []))
+        return options
+
+    def options_for(self, chars):
+        """(IDC options, radical options) among `chars`."""
+        ids = [self.ids[c] for c in chars if c in self.ids]
+        return (
+            sorted({self.idcs[i] for i in ids} - {""}),
+            sorted({self.radicals[i] for i in ids} - {""}),
+        )
+
+    def filter_chars(self, chars, radical=None, idc=None):
+        """Keep the characters of `chars` with the given radical and IDC, in order."""
+        if radical is None and idc is None:
+            return list(chars)
+        allowed = self.matching(radical=radical, idc=idc)
+        ids = self.ids
+        return [c for c in chars if c in ids and ids[c] in allowed]
+
+# Positions of the set bits in each byte value, lowest first
+BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+class MembershipIndex:
+    """component_map as bitsets over character positions, for set queries.
+
+    Bit i of a component's bitset (a Python int) is set when the i-th
+    character of char_decomp contains it, so AND/OR/AND-NOT of whole
+    components costs a few machine words per 64 characters and decoding
+    yields characters in source order. Bitsets of popular components are
+    kept once built; small ones are cheap to rebuild.
+    """
+
+    KEEP_MEMBERS = 256
+
+    def __init__(self, char_decomp, component_map):
+        self.component_map = component_map
+        self.chars = list(char_decomp)
+        self.positions = {char: i for i, char in enumerate(self.chars)}
+        self._nbytes = (len(self.chars) + 7) // 8
+        self._bits = {}
+
+    def bits(self, comp):
+        bits = self._bits.get(comp)
+        if bits is None:
+            members = self.component_map.get(comp, ())
+            buf = bytearray(self._nbytes)
+            positions = self.positions
+            for char in members:
+                i = positions[char]
+                buf[i >> 3] |= 1 << (i & 7)
+            bits = int.from_bytes(buf, "little")
+            if len(members) >= self.KEEP_MEMBERS:
+                self._bits[comp] = bits
+        return bits
+
+    def decode(self, bits):
+        chars = self.chars
+        found = []
+        for index, byte in enumerate(bits.to_bytes(self._nbytes, "little")):
+            if byte:
+                base = index << 3
+                found.extend(chars[base + bit] for bit in BYTE_BITS[byte])
+        return found
+
+    def query(self, all_of=(), any_of=(), none_of=()):
+        """Characters containing every all_of component, at least one any_of
+        component (if given) and no none_of component, in source order."""
+        if not all_of and not any_of:
+            return []
+        result = -1
+        # Smallest operand first, so an empty intersection stops early
+        for bits in sorted((self.bits(comp) for comp in set(all_of)), key=int.bit_count):
+            result &= bits
+            if not result:
+                return []
+        if any_of:
+            either = 0
+            for comp in set(any_of):
+                either |= self.bits(comp)
+            result &= either
+        for comp in set(none_of):
+            if not result:
+                break
+            result &= ~self.bits(comp)
+        return self.decode(result) if result else []
+
+def parse_ids(text):
+    """Parse an IDS string into a tree of (idc, parts) tuples with character leaves.
+
+    Raises ValueError if an IDC is missing parts or characters are left over.
+    """
+    pos = 0
+    def node():
+        nonlocal pos
+        if pos >= len(text):
+            raise ValueError(f"'{text}' ends before every IDC has its parts")
+        char = text[pos]
+        pos += 1
+        if char in IDC_ARITY:
+            return (char, tuple(node() for _ in range(IDC_ARITY[char])))
+        return char
+    tree = node()
+    if pos != len(text):
+        raise ValueError(f"unexpected '{text[pos:]}' after a complete description in '{text}'")
+    return tree
+
+def parse_pattern(pattern):
+    """Parse a structural search pattern such as ⿰氵? or ⿰亻⿱??; wildcards become '?'."""
+    pattern = "".join('?' if c in WILDCARDS else c for c in pattern if not c.isspace())
+    tree = parse_ids(pattern)
+    if isinstance(tree, str):
+        raise ValueError("A pattern must start with an IDC such as ⿰ or ⿱")
+    return tree
+
+class StructureIndex:
+    """Parsed decomposition trees with an (IDC, slot, token) -> characters index.
+
+    A slot's tokens are the component filling it and, when that part has
+    structure of its own (written inline or as the component's decomposition),
+    its top-level IDC. Patterns are anchored at the top of the decomposition:
+    candidates come from intersecting the index entries of the pattern's top
+    level and only nested pattern parts are checked against the trees.
+    """
+
+    def __init__(self, char_decomp):
+        self.chars = list(char_decomp)
+        self.trees = {}
+        for char, entry in char_decomp.items():
+            decomposition = entry.get("decomposition", "")
+            if not isinstance(decomposition, str) or decomposition[:1] not in IDC_ARITY:
+                continue
+            try:
+                self.trees[char] = parse_ids(decomposition)
+            except ValueError:
+                continue
+        self.by_idc = defaultdict(set)
+        self.slots = defaultdict(set)
+        for i, char in enumerate(self.chars):
+            tree = self.trees.get(char)
+            if tree is None:
+                continue
+            idc, parts = tree
+            self.by_idc[idc].add(i)
+            for slot, part in enumerate(parts):
+                for token in self.tokens(part):
+                    self.slots[idc, slot, token].add(i)
+
+    def tokens(self, part):
+        if isinstance(part, tuple):
+            return (part[0],)
+        tree = self.trees.get(part)
+        return (part, tree[0]) if tree else (part,)
+
+    def matches(self, node, pattern):
+        if pattern == '?':
+            return True
+        if isinstance(pattern, str):
+            return node == pattern
+        if isinstance(node, str):
+            node = self.trees.get(node)
+            if node is None:
+                return False
+        return node[0] == pattern[0] and all(self.matches(n, p) for n, p in zip(node[1], pattern[1]))
+
+    def search(self, pattern):
+        """Characters whose decomposition matches pattern, in source order."""
+        tree = parse_pattern(pattern)
+        idc, parts = tree
+        sets = [self.by_idc.get(idc, set())]
+        for slot, part in enumerate(parts):
+            if part != '?':
+                sets.append(self.slots.get((idc, slot, part if isinstance(part, str) else part[0]), set()))
+        sets.sort(key=len)
+        ids = set(sets[0]).intersection(*sets[1:])
+        if any(isinstance(part, tuple) for part in parts):
+            ids = [i for i in ids if self.matches(self.trees[self.chars[i]], tree)]
+        return [self.chars[i] for i in sorted(ids)]
+
+class CompoundIndex:
+    """Compound phrases bucketed by length, plus a reverse index by character.
+
+    by_length[char][n] holds char's own compounds of length n in source order,
+    with_length[n] is the set of characters that have any, and containing[c]
+    lists every distinct phrase (from any entry) with c at any position.
+    """
+
+    def __init__(self, char_decomp):
+        self.by_length = {}
+        self.with_length = defaultdict(set)
+        self.containing = defaultdict(list)
+        seen = set()
+        for char, entry in char_decomp.items():
+            buckets = defaultdict(list)
+            for phrase in entry.get("compounds", []):
+                if not isinstance(phrase, str):
+                    continue
+                buckets[len(phrase)].append(phrase)
+                if phrase not in seen:
+                    seen.add(phrase)
+                    for c in dict.fromkeys(phrase):
+                        self.containing[c].append(phrase)
+            if buckets:
+                self.by_length[char] = {n: tuple(phrases) for n, phrases in buckets.items()}
+                for n in buckets:
+                    self.with_length[n].add(char)
+
+    def of_length(self, char, length):
+        return self.by_length.get(char, {}).get(length, ())
+
+    def phrases_containing(self, char):
+        return self.containing.get(char, ())
+
+# Combining marks left by NFD-decomposing a pinyin vowel, by tone number
+PINYIN_TONES = {'\u0304': 1, '\u0301': 2, '\u030c': 3, '\u0300': 4}
+TEXT_STOPWORDS = {"a", "an", "and", "as", "at", "by", "for", "from", "in", "is", "of", "on", "or", "the", "to", "with"}
+
+def pinyin_syllable(syllable):
+    """(toneless syllable, tone) for "mù", "mu4" or "lü3"; ü is spelled v and
+    a syllable without a tone is neutral (5)."""
+    syllable = syllable.lower().replace("u:", "v")
+    tone = 5
+    if syllable[-1:] in "12345":
+        tone = int(syllable[-1])
+        syllable = syllable[:-1]
+    letters = []
+    for ch in unicodedata.normalize("NFD", syllable):
+        if ch in PINYIN_TONES:
+            tone = PINYIN_TONES[ch]
+        elif ch == '\u0308':
+            letters[-1:] = ["v"]
+        else:
+            letters.append(ch)
+    return "".join(letters), tone
+
+def text_tokens(text):
+    return [word for word in re.findall(r"[a-z]+", text.lower()) if word not in TEXT_STOPWORDS]
+
+class TextIndex:
+    """Inverted indexes from pinyin readings and English words to characters.
+
+    readings[syllable][tone] and words[word][position] hold character
+    positions; a word's weight is 2 from the definition and 1 from the
+    etymology. Sorted key lists let the last query term match as a prefix,
+    so results appear while a word is still being typed.
+    """
+
+    def __init__(self, char_decomp):
+        self.chars = list(char_decomp)
+        self.readings = {}
+        self.words = defaultdict(dict)
+        for i, (char, entry) in enumerate(char_decomp.items()):
+            pinyin = entry.get("pinyin", "")
+            for reading in re.split(r"[\s,;/]+", " ".join(pinyin) if isinstance(pinyin, list) else pinyin or ""):
+                if reading:
+                    syllable, tone = pinyin_syllable(reading)
+                    self.readings.setdefault(syllable, {}).setdefault(tone, set()).add(i)
+            etymology = entry.get("etymology") or {}
+            for text, weight in ((etymology.get("hint"), 1), (etymology.get("details"), 1), (entry.get("definition"), 2)):
+                for word in text_tokens(" ".join(text) if isinstance(text, list) else text or ""):
+                    self.words[word][i] = weight
+        self.syllable_keys = sorted(self.readings)
+        self.word_keys = sorted(self.words)
+
+    def _prefixed(self, keys, prefix):
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + "\uffff")
+        return keys[start:end]
+
+    def term_scores(self, term, prefix=False):
+        """position -> score for one query term; exact matches beat prefix ones."""
+        scores = {}
+        def add(i, score):
+            if score > scores.get(i, 0):
+                scores[i] = score
+        syllable, tone = pinyin_syllable(term)
+        toned = term[-1:] in "12345" or syllable != term.lower()
+        for key in self._prefixed(self.syllable_keys, syllable) if prefix and not toned else (syllable,):
+            for key_tone, ids in self.readings.get(key, {}).items():
+                if key != syllable:
+                    score = 1
+                elif not toned:
+                    score = 4
+                elif key_tone == tone:
+                    score = 5
+                else:
+                    continue
+                for i in ids:
+                    add(i, score)
+        if not toned:
+            for word in self._prefixed(self.word_keys, term) if prefix else (term,):
+                exact = word == term
+                for i, weight in self.words.get(word, {}).items():
+                    add(i, weight * 2 if exact else weight)
+        return scores
+
+    def search(self, query, limit=50):
+        """Characters matching every term of query, best first.
+
+        Terms are pinyin (tone marks or digits optional) or English words;
+        the last one may be a prefix of two or more letters. Ties keep
+        source order.
+        """
+        terms = [term for term in re.split(r"[\s,;]+", query.strip().lower()) if term and term not in TEXT_STOPWORDS]
+        if not terms:
+            return []
+        totals = None
+        for n, term in enumerate(terms):
+            # A one-letter prefix matches too much of the index to be useful
+            scores = self.term_scores(term, prefix=n == len(terms) - 1 and len(term) > 1)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {i: total + scores[i] for i, total in totals.items() if i in scores}
+            if not totals:
+                return []
+        ranked = sorted(totals, key=lambda i: (-totals[i], i))
+        return [self.chars[i] for i in ranked[:limit]]
+
+# Result orders: name -> label shown in the app
+RESULT_ORDERS = {"strokes": "Stroke count", "pinyin": "Pinyin", "radical": "Radical", "compounds": "Compound count"}
+
+class RankIndex:
+    """Global orderings of the characters, computed once per dataset.
+
+    orders[name] is a permutation of store IDs and ranks[name][id] each ID's
+    place in it, for every RESULT_ORDERS name: stroke count; pinyin (toneless
+    syllable, then tone); radical, then stroke count; and number of phrases
+    containing the character, most first. Ties keep source order, and
+    characters without an entry sort first, as they do by stroke count.
+    """
+
+    # Walk the whole permutation once a result set is at least this share of it
+    WALK_SHARE = 0.125
+
+    def __init__(self, store, char_decomp, compounds):
+        strokes = store.strokes
+        def pinyin_key(i):
+            pinyin = char_decomp[store.chars[i]].get("pinyin", "")
+            if isinstance(pinyin, list):
+                # The first reading, as cards show it
+                pinyin = pinyin[0] if pinyin else ""
+            reading = re.split(r"[\s,;/]+", pinyin.strip())[0] if isinstance(pinyin, str) else ""
+            return pinyin_syllable(reading) if reading else ("\uffff", 0)
+        def radical_key(i):
+            return store.radical_names[store.radical_ids[i]] or "\uffff", strokes[i]
+        def compounds_key(i):
+            return -len(compounds.phrases_containing(store.chars[i])), strokes[i]
+        keys = {"strokes": strokes.__getitem__, "pinyin": pinyin_key, "radical": radical_key, "compounds": compounds_key}
+        ids = range(len(store.chars))
+        self.store = store
+        self.orders = {name: array("I", sorted(ids, key=key)) for name, key in keys.items()}
+        self.ranks = {}
+        for name, order in self.orders.items():
+            rank = array("I", bytes(4 * len(order)))
+            for position, i in enumerate(order):
+                rank[i] = position
+            self.ranks[name] = rank
+
+    def __getstate__(self):
+        # Persisted without the store, which the loader sets again
+        state = dict(vars(self))
+        del state["store"]
+        return state
+
+    def ordered(self, chars, order="strokes", limit=None):
+        """chars in the given order, or only the first `limit` of them.
+
+        Large result sets are read off the precomputed permutation, which
+        stops as soon as `limit` characters are found; small ones are
+        ranked directly.
+        """
+        ids, rank, store_chars = self.store.ids, self.ranks[order], self.store.chars
+        unknown = [c for c in chars if c not in ids]
+        known = len(chars) - len(unknown)
+        if limit is not None and len(unknown) >= limit:
+            return unknown[:limit]
+        wanted = None if limit is None else limit - len(unknown)
+        if known >= self.WALK_SHARE * len(rank):
+            members = {ids[c] for c in chars if c in ids}
+            found = []
+            for i in self.orders[order]:
+                if i in members:
+                    found.append(store_chars[i])
+                    if len(found) == wanted:
+                        break
+            return unknown + found
+        key = lambda c: rank[ids[c]]
+        known_chars = [c for c in chars if c in ids]
+        if wanted is not None and wanted < known:
+            return unknown + heapq.nsmallest(wanted, known_chars, key=key)
+        return unknown + sorted(known_chars, key=key)
+
+# Phrase modes for Explorer.results/compounds_for: None shows single
+# characters, an int N shows each result's own compounds of length N and
+# ANY_POSITION shows every phrase containing the result anywhere.
+ANY_POSITION = "any"
+
+def load_diagnostics(invalid, cycles):
+    """Data-quality warnings found while loading, as {"type", "message"} dicts."""
+    messages = [
+        {"type": "warning", "message": f"Invalid component '?' in decomposition for {char}: {decomposition}"}
+        for char, decomposition in invalid
+    ]
+    messages.extend(
+        {"type": "warning", "message": f"Decomposition cycle between {' → '.join(cycle)}"}
+        for cycle in cycles
+    )
+    return messages
+
+class DiagnosticLog:
+    """The most recent distinct messages with occurrence counts.
+
+    Repeating a message bumps its count and makes it the newest; beyond
+    `limit` distinct messages the oldest is dropped, so memory and render
+    cost stay constant however long a session runs.
+    """
+
+    def __init__(self, limit=50):
+        self.limit = limit
+        self.dropped = 0
+        self._entries = OrderedDict()
+
+    def add(self, type, message):
+        key = (type, message)
+        self._entries[key] = self._entries.pop(key, 0) + 1
+        if len(self._entries) > self.limit:
+            self._entries.popitem(last=False)
+            self.dropped += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        """{"type", "message", "count"} dicts, oldest first."""
+        for (type, message), count in self._entries.items():
+            yield {"type": type, "message": message, "count": count}
+
+class Explorer:
+    """A loaded dataset with its component map and query indexes."""
+
+    def __init__(self, char_decomp, component_map=None, max_depth=5, diagnostics=(), cycles=(), workers=1):
+        self.char_decomp = char_decomp
+        self.max_depth = max_depth
+        self.workers = workers
+        self.cycles = [list(cycle) for cycle in cycles]
+        # Bumped by reloaded(), so callers can key caches on the snapshot
+        self.generation = 0
+        diagnostics = list(diagnostics)
+        if component_map is None:
+            component_map, self.cycles = build_component_map(char_decomp, max_depth, workers)
+            diagnostics.extend(load_diagnostics((), self.cycles))
+        if isinstance(component_map, dict):
+            component_map = CompactComponentMap(component_map, self.store)
+        # Found once at load time and shared by every session, so read-only
+        self.diagnostics = tuple(diagnostics)
+        self.component_map = component_map
+
+    # Cached properties persisted beside the compiled index by load()
+    PERSISTED = ("facets", "compounds", "structures", "text_index", "ranks")
+
+    @classmethod
+    def load(cls, json_path="strokes1.json", max_depth=5, persist=True, workers=1):
+        """Load through the compiled index, recompiling it if the JSON changed.
+
+        With persist, the PERSISTED indexes are read from the on-disk cache,
+        or built and written there when it is missing, stale or corrupt.
+        workers is passed on to build_component_map for (re)compiles. An
+        index compiled for a larger max_depth is reused through a DepthView.
+        """
+        import compiled_index
+        index = compiled_index.open_index(json_path, max_depth=max_depth, workers=workers)
+        diagnostics = load_diagnostics(index.meta["invalid_decompositions"], index.meta["cycles"])
+        component_map = index.component_map
+        if index.max_depth > max_depth:
+            # Compiled for a deeper setting: read this one off the same depths
+            component_map = DepthView(component_map, max_depth + 2)
+        explorer = cls(index.char_decomp, component_map, max_depth, diagnostics, index.meta["cycles"], workers)
+        explorer.index = index
+        explorer.store = CharStore.from_index(index)
+        if persist:
+            structures = compiled_index.load_derived(index, max_depth=max_depth)
+            if structures is not None and set(structures) == set(cls.PERSISTED):
+                structures["facets"].component_map = explorer.component_map
+                structures["ranks"].store = explorer.store
+                vars(explorer).update(structures)
+            else:
+                compiled_index.save_derived(index, {name: getattr(explorer, name) for name in cls.PERSISTED},
+                                            max_depth=max_depth)
+        return explorer
+
+    @classmethod
+    def from_json(cls, json_path="strokes1.json", max_depth=5, workers=1):
+        char_decomp, invalid = load_json_entries(json_path)
+        return cls(char_decomp, None, max_depth, load_diagnostics(invalid, ()), workers=workers)
+
+    def reloaded(self, json_path="strokes1.json"):
+        """A new Explorer for json_path's current contents, recomputing only
+        the closures its changes can affect (see update_component_map)."""
+        char_decomp, invalid = load_json_entries(json_path)
+        component_map, cycles, affected = update_component_map(
+            self.component_map, self.char_decomp, char_decomp, self.max_depth, self.cycles, workers=self.workers)
+        explorer = type(self)(char_decomp, component_map, self.max_depth, load_diagnostics(invalid, cycles), cycles,
+                              self.workers)
+        explorer.generation = self.generation + 1
+        explorer.affected = affected
+        return explorer
+
+    @cached_property
+    def store(self):
+        return CharStore.from_entries(self.char_decomp)
+
+    @cached_property
+    def facets(self):
+        return FacetIndex(self.store, self.component_map)
+
+    @cached_property
+    def compounds(self):
+        return CompoundIndex(self.char_decomp)
+
+    @cached_property
+    def members(self):
+        return MembershipIndex(self.char_decomp, self.component_map)
+
+    @cached_property
+    def structures(self):
+        return StructureIndex(self.char_decomp)
+
+    @cached_property
+    def text_index(self):
+        return TextIndex(self.char_decomp)
+
+    @cached_property
+    def ranks(self):
+        return RankIndex(self.store, self.char_decomp, self.compounds)
+
+    def stroke_count(self, char):
+        return self.store.stroke_count(char)
+
+    def ordered(self, chars, order="strokes", limit=None):
+        """chars in a RESULT_ORDERS order, or just the first `limit` (see RankIndex.ordered)."""
+        return self.ranks.ordered(chars, order, limit)
+
+    def fields(self, char):
+        """Display fields for char, in Pinyin, Strokes, Radical, Decomposition, Definition, Etymology order."""
+        entry = self.char_decomp.get(char, {})
+        stroke_count = entry.get("strokes", -1)
+        return {
+            "Pinyin": clean_field(entry.get("pinyin", "—")),
+            "Strokes": stroke_count if stroke_count != -1 else "unknown",
+            "Radical": clean_field(entry.get("radical", "—")),
+            "Decomposition": format_decomposition(entry),
+            "Definition": clean_field(entry.get("definition", "No definition available")),
+            "Etymology": get_etymology_text(entry)
+        }
+
+    def radicals(self):
+        """Components that are their own radical."""
+        radical = self.store.radical
+        return [comp for comp in self.component_map if radical(comp) == comp]
+
+    def get_all_components(self, char):
+        """Components within max_depth + 1 decomposition steps below char.
+
+        char itself is only included if its decomposition leads back to it.
+        """
+        if not is_valid_char(char):
+            return set()
+        found = set()
+        expanded = {char}
+        frontier = [char]
+        for _ in range(self.max_depth + 1):
+            next_frontier = []
+            for node in frontier:
+                for comp in self.char_decomp.get(node, {}).get("decomposition", ""):
+                    if comp in IDC_CHARS or comp == '?' or not is_valid_char(comp):
+                        continue
+                    found.add(comp)
+                    if comp not in expanded:
+                        expanded.add(comp)
+                        next_frontier.append(comp)
+            frontier = next_frontier
+        return found
+
+    def components(self, stroke=None, radical=None, idc=None):
+        """Input components matching the component filters, in stroke-count order."""
+        return self.facets.filtered_components(stroke, radical, idc)
+
+    @property
+    def containment_limit(self):
+        """The deepest containment depth component_map covers."""
+        return self.max_depth + 2
+
+    def containing(self, comp, depth=None):
+        """Characters containing comp at most `depth` steps down (None: any depth covered), in source order."""
+        chars = self.component_map.get(comp, [])
+        if depth is None or depth >= self.containment_limit or not chars:
+            return chars
+        return [char for char, d in zip(chars, self.component_map.member_depths(comp)) if d <= depth]
+
+    def depth_counts(self, comp):
+        """{containment depth: number of characters containing comp that deep}, shallowest first."""
+        if comp not in self.component_map:
+            return {}
+        return dict(sorted(Counter(self.component_map.member_depths(comp)).items()))
+
+    def results(self, comp, radical=None, idc=None, phrases=None, depth=None):
+        """Characters containing comp within `depth` (see containing), filtered
+        by output radical/IDC and phrase mode, in source order."""
+        return self.filter_results(self.containing(comp, depth), radical, idc, phrases)
+
+    def results_by_depth(self, comp, radical=None, idc=None, phrases=None):
+        """Like results, grouped as {containment depth: characters}, shallowest first."""
+        chars = self.component_map.get(comp, [])
+        if not chars:
+            return {}
+        depths = dict(zip(chars, self.component_map.member_depths(comp)))
+        groups = defaultdict(list)
+        for char in self.filter_results(chars, radical, idc, phrases):
+            groups[depths[char]].append(char)
+        return dict(sorted(groups.items()))
+
+    def query(self, all_of=(), any_of=(), none_of=(), radical=None, idc=None, phrases=None):
+        """Like results, for characters containing all of `all_of`, any of
+        `any_of` and none of `none_of` (see MembershipIndex.query)."""
+        return self.filter_results(self.members.query(all_of, any_of, none_of), radical, idc, phrases)
+
+    def structure_search(self, pattern, radical=None, idc=None, phrases=None):
+        """Like results, for characters whose decomposition matches an IDS pattern.
+
+        Raises ValueError for a malformed pattern.
+        """
+        return self.filter_results(self.structures.search(pattern), radical, idc, phrases)
+
+    def search_text(self, query, limit=50):
+        """Characters whose pinyin, definition or etymology match query, best first (see TextIndex.search)."""
+        return self.text_index.search(query, limit)
+
+    def filter_results(self, chars, radical=None, idc=None, phrases=None):
+        """Apply the output radical/IDC filters and phrase mode to `chars`."""
+        chars = self.facets.filter_chars(chars, radical=radical, idc=idc)
+        if phrases is None:
+            return chars
+        if phrases == ANY_POSITION:
+            containing = self.compounds.containing
+            return [c for c in chars if c in containing]
+        with_length = self.compounds.with_length.get(phrases, set())
+        return [c for c in chars if c in with_length]
+
+    def compounds_for(self, char, phrases):
+        if phrases is None:
+            return ()
+        if phrases == ANY_POSITION:
+            return self.compounds.phrases_containing(char)
+        return self.compounds.of_length(char, phrases)
+
+class ExplorerWatcher:
+    """Keeps `current` in step with a strokes1.json that changes on disk.
+
+    A daemon thread polls the file's size and mtime every `interval`
+    seconds and builds the next snapshot with Explorer.reloaded, warming the
+    named cached properties before swapping it in with a single attribute
+    assignment. Readers take `watcher.current` once per request and keep
+    using that snapshot, so they never see a half-built index. A failed
+    reload (say, a file caught mid-write) keeps the old snapshot, sets
+    `last_error` and is retried on the next poll.
+    """
+
+    def __init__(self, explorer, json_path="strokes1.json", interval=2.0, warm=()):
+        self.current = explorer
+        self.json_path = json_path
+        self.interval = interval
+        self.warm = tuple(warm)
+        self.last_error = None
+        self._stamp = self._file_stamp()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.json_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self):
+        """Reload if the file changed since the last successful load; True if swapped."""
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp is None or stamp == self._stamp:
+                return False
+            try:
+                explorer = self.current.reloaded(self.json_path)
+                for name in self.warm:
+                    getattr(explorer, name)
+            except Exception as e:
+                self.last_error = f"Failed to reload {self.json_path}: {e}"
+                return False
+            self.current = explorer
+            self._stamp = stamp
+            self.last_error = None
+            return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="radix-reload", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,112 @@
+"""Streamed exports of result sets as CSV, TSV, JSONL, Anki cards or a compound list.
+
+iter_export yields the file a row at a time, so writing out the whole
+dataset never holds more than one row's text in memory; write_export copies
+it to any text stream. Whoever serves the file decides what it costs after
+that: a Streamlit download button holds all of it. Kept free of Streamlit
+like radix_cards.
+"""
+import csv
+import html
+import io
+import json
+import re
+
+COLUMNS = ["character", "pinyin", "strokes", "radical", "decomposition", "definition", "compounds"]
+
+# Format name -> (file extension, MIME type)
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "TSV": ("tsv", "text/tab-separated-values"),
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "Anki": ("txt", "text/plain"),
+    "Compounds": ("txt", "text/plain"),
+}
+
+# First line of the Compounds format, for pasting into a chatbot
+COMPOUNDS_PROMPT = "Give me the hanyu pinyin and meaning of each compound phrase in one line a phrase in a downloadable word file"
+
+def export_records(explorer, chars, phrases=None):
+    """One dict per character with COLUMNS as keys.
+
+    compounds are the phrases the given phrase mode shows, or all of the
+    character's own compounds when phrases is None.
+    """
+    for char in chars:
+        fields = explorer.fields(char)
+        if phrases is None:
+            compounds = [p for p in explorer.char_decomp.get(char, {}).get("compounds", []) if isinstance(p, str)]
+        else:
+            compounds = list(explorer.compounds_for(char, phrases))
+        yield {
+            "character": char,
+            "pinyin": fields["Pinyin"],
+            "strokes": fields["Strokes"],
+            "radical": fields["Radical"],
+            "decomposition": fields["Decomposition"],
+            "definition": fields["Definition"],
+            "compounds": compounds,
+        }
+
+def _delimited(records, delimiter):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    for record in records:
+        writer.writerow([" ".join(record[c]) if c == "compounds" else record[c] for c in COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def _jsonl(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+def _anki(records):
+    # Anki's plain-text import reads these header lines; the front is the
+    # character and the back carries the other fields as HTML
+    yield "#separator:tab\n#html:true\n#columns:Front\tBack\tTags\n"
+    for record in records:
+        back = "<br>".join(html.escape(str(part)) for part in (
+            record["pinyin"],
+            record["definition"],
+            f"{record['strokes']} strokes · radical {record['radical']} · {record['decomposition']}",
+            " ".join(record["compounds"]),
+        ) if part)
+        yield f"{html.escape(record['character'])}\t{back}\tradix\n"
+
+def _compounds(records):
+    yield COMPOUNDS_PROMPT + "\n\n"
+    # A phrase can belong to several characters; list it once
+    seen = set()
+    for record in records:
+        for phrase in record["compounds"]:
+            if phrase not in seen:
+                seen.add(phrase)
+                yield phrase + "\n"
+
+def iter_export(explorer, chars, fmt, phrases=None):
+    """Yield the export of chars in format fmt (a FORMATS key) as text chunks."""
+    records = export_records(explorer, chars, phrases)
+    if fmt == "CSV":
+        return _delimited(records, ",")
+    if fmt == "TSV":
+        return _delimited(records, "\t")
+    if fmt == "JSONL":
+        return _jsonl(records)
+    if fmt == "Anki":
+        return _anki(records)
+    if fmt == "Compounds":
+        return _compounds(records)
+    raise ValueError(f"unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+def write_export(explorer, chars, fmt, out, phrases=None):
+    """Write the export to the text stream out."""
+    for chunk in iter_export(explorer, chars, fmt, phrases):
+        out.write(chunk)
+
+def export_filename(name, fmt):
+    """A file name for an export of name (a component or query description)."""
+    stem = re.sub(r"\W+", "_", name).strip("_") or "radix"
+    return f"{stem}.{FORMATS[fmt][0]}"
@@ -0,0 +1,150 @@
+"""Per-rerun phase timing and counters, aggregated per process.
+
+Each Streamlit rerun gets a RerunTimer (see `start_rerun`). Phases are timed
+with `timer.phase(name)`; `timer.cached(name, calls)` also counts cache hits
+and misses, where a miss is a cached function body calling
+`note_cache_miss(name)` on the same thread.
+Finished reruns feed the process-wide REGISTRY, which keeps a rolling window
+per phase for p50/p95, logs one JSON line per rerun to the "radix.metrics"
+logger and can serve Prometheus text on a small HTTP endpoint.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("radix.metrics")
+_current = threading.local()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+class RerunTimer:
+    """Phase durations (seconds) and counters for one rerun."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.counters = Counter()
+        self._misses = Counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @contextmanager
+    def cached(self, name, calls=1):
+        with self.phase(name):
+            yield
+        misses = self._misses.pop(name, 0)
+        if misses:
+            self.counters[f"cache_miss.{name}"] += misses
+        if calls > misses:
+            self.counters[f"cache_hit.{name}"] += calls - misses
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+class MetricsRegistry:
+    """Rolling per-phase timings and running counter totals for this process."""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._timings = defaultdict(lambda: deque(maxlen=window))
+        self.totals = Counter()
+        self.reruns = 0
+
+    def record(self, timer, context=None):
+        total = timer.elapsed()
+        with self._lock:
+            self.reruns += 1
+            self._timings["rerun"].append(total)
+            for name, seconds in timer.phases.items():
+                self._timings[name].append(seconds)
+            self.totals.update(timer.counters)
+        logger.info(json.dumps({
+            "event": "rerun",
+            "total_ms": round(total * 1000, 3),
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in timer.phases.items()},
+            "counters": dict(timer.counters),
+            **(context or {}),
+        }, ensure_ascii=False))
+
+    def summary(self):
+        """{phase: (p50 seconds, p95 seconds, samples)} over the rolling window."""
+        with self._lock:
+            timings = {name: list(values) for name, values in self._timings.items()}
+        return {name: (percentile(values, 0.5), percentile(values, 0.95), len(values))
+                for name, values in timings.items()}
+
+    def prometheus_text(self):
+        lines = [
+            "# TYPE radix_phase_seconds summary",
+        ]
+        for name, (p50, p95, samples) in sorted(self.summary().items()):
+            lines.append(f'radix_phase_seconds{{phase="{name}",quantile="0.5"}} {p50:.6f}')
+            lines.append(f'radix_phase_seconds{{phase="{name}",quantile="0.95"}} {p95:.6f}')
+            lines.append(f'radix_phase_seconds_count{{phase="{name}"}} {samples}')
+        lines.append("# TYPE radix_events_total counter")
+        with self._lock:
+            totals = sorted(self.totals.items())
+            reruns = self.reruns
+        for name, value in totals:
+            lines.append(f'radix_events_total{{name="{name}"}} {value}')
+        lines.append("# TYPE radix_reruns_total counter")
+        lines.append(f"radix_reruns_total {reruns}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+def start_rerun():
+    timer = _current.timer = RerunTimer()
+    return timer
+
+def current_timer():
+    return getattr(_current, "timer", None)
+
+def note_cache_miss(name):
+    """Call from inside a cached function body: its rerun records a miss."""
+    timer = current_timer()
+    if timer is not None:
+        timer._misses[name] += 1
+
+def finish_rerun(timer, context=None):
+    REGISTRY.record(timer, context)
+    if getattr(_current, "timer", None) is timer:
+        del _current.timer
+
+def serve_metrics(port, host="127.0.0.1", registry=REGISTRY):
+    """Serve registry.prometheus_text() at /metrics from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="radix-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,35 @@
+"""Recompiling a compiled index whose sections were corrupted on disk."""
+import json
+
+import compiled_index
+
+def write_source(tmp_path):
+    json_path = tmp_path / "strokes1.json"
+    json_path.write_text(json.dumps([
+        {"character": "木", "decomposition": ""},
+        {"character": "林", "decomposition": "⿰木木"},
+        {"character": "口", "decomposition": ""},
+        {"character": "杏", "decomposition": "⿱木口"},
+    ], ensure_ascii=False), encoding="utf-8")
+    return str(json_path)
+
+def corrupt_section(path, section):
+    data = bytearray(open(path, "rb").read())
+    count = compiled_index.HEADER.unpack_from(data)[-1]
+    for i in range(count):
+        name, offset, length, _ = compiled_index.SECTION.unpack_from(
+            data, compiled_index.HEADER.size + i * compiled_index.SECTION.size)
+        if name.rstrip(b"\0").decode("ascii") == section:
+            data[offset] ^= 0xFF
+    with open(path, "wb") as f:
+        f.write(data)
+
+def test_corrupt_section_is_recompiled(tmp_path):
+    json_path = write_source(tmp_path)
+    index = compiled_index.open_index(json_path)
+    expected = {comp: index.component_map[comp] for comp in index.component_map}
+    index.close()
+    corrupt_section(index.path, "compmem")
+    index = compiled_index.open_index(json_path)
+    assert {comp: index.component_map[comp] for comp in index.component_map} == expected
+    index.close()
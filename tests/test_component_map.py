@@ -0,0 +1,131 @@
+"""Component map builds, updates and views against reference builds of the same data."""
+import pytest
+
+import radix_engine
+
+def entries(decompositions):
+    return {char: {"character": char, "decomposition": decomposition}
+            for char, decomposition in decompositions.items()}
+
+OLD = entries({
+    "木": "",
+    "林": "⿰木木",
+    "森": "⿱木林",
+    "口": "",
+    "杏": "⿱木口",
+    "呆": "⿱口木",
+    "困": "⿴口木",
+    "霖": "⿱雨林",
+    # 木 three steps down, past a DepthView's limit of 2
+    "鬱": "⿱霖口",
+})
+
+CYCLIC = entries({
+    # 甲 -> 乙 -> 丙 -> 甲
+    "甲": "⿰乙口",
+    "乙": "⿱丙木",
+    "丙": "⿰甲口",
+    "丁": "⿰丁一",
+    "戊": "⿱甲林",
+    # A chain longer than the deepest max_depth tested
+    "子": "⿱丑口",
+    "丑": "⿱寅口",
+    "寅": "⿱卯口",
+    "卯": "⿱辰口",
+    "辰": "⿱巳口",
+    "巳": "⿱午口",
+    "午": "⿱未口",
+    "未": "⿱申一",
+    "申": "",
+    "亥": "⿰子?",
+})
+
+def edited():
+    # Change a decomposition, drop a character and add new ones whose
+    # components (一, 丁) sort before every existing key
+    new = dict(OLD)
+    new["杏"] = {"character": "杏", "decomposition": "⿱一口"}
+    del new["困"]
+    new["丁"] = {"character": "丁", "decomposition": "⿱一亅"}
+    new["打"] = {"character": "打", "decomposition": "⿰扌丁"}
+    return new
+
+def assert_same_map(actual, expected):
+    assert list(actual) == list(expected)
+    for comp in expected:
+        assert actual[comp] == expected[comp]
+        assert bytes(actual.member_depths(comp)) == bytes(expected.member_depths(comp))
+
+def recursive_component_map(char_decomp, max_depth):
+    """The component map as the app built it before closures were memoized."""
+    def get_all_components(char, depth=0, seen=None):
+        seen = set() if seen is None else seen
+        if char in seen or depth > max_depth or not radix_engine.is_valid_char(char):
+            return set()
+        seen.add(char)
+        components = set()
+        for comp in char_decomp.get(char, {}).get("decomposition", ""):
+            if comp in radix_engine.IDC_CHARS or comp == "?" or not radix_engine.is_valid_char(comp):
+                continue
+            components.add(comp)
+            components.update(get_all_components(comp, depth + 1, seen.copy()))
+        return components
+
+    component_map = {}
+    for char in char_decomp:
+        components = {char}
+        decomposition = char_decomp[char].get("decomposition", "")
+        if decomposition and "?" not in decomposition:
+            for comp in decomposition:
+                if radix_engine.is_valid_char(comp):
+                    components.add(comp)
+                    components.update(get_all_components(comp))
+        for comp in components:
+            component_map.setdefault(comp, []).append(char)
+    return component_map
+
+@pytest.mark.parametrize("max_depth", [0, 2, 5])
+def test_build_matches_recursive_closure(max_depth):
+    data = dict(OLD, **CYCLIC)
+    component_map, _ = radix_engine.build_component_map(data, max_depth)
+    assert dict(component_map) == recursive_component_map(data, max_depth)
+
+def test_update_matches_rebuild():
+    old_map, cycles = radix_engine.build_component_map(OLD, max_depth=1)
+    new = edited()
+    updated, _, affected = radix_engine.update_component_map(old_map, OLD, new, max_depth=1, cycles=cycles,
+                                                             full_rebuild_share=1.0)
+    assert affected is not None
+    assert isinstance(updated, radix_engine.PatchedComponentMap)
+    rebuilt, _ = radix_engine.build_component_map(new, max_depth=1)
+    assert_same_map(updated, rebuilt)
+
+def test_repeated_updates_match_rebuild():
+    old_map, cycles = radix_engine.build_component_map(OLD, max_depth=1)
+    new = edited()
+    patched, cycles, _ = radix_engine.update_component_map(old_map, OLD, new, max_depth=1, cycles=cycles,
+                                                           full_rebuild_share=1.0)
+    newer = dict(new)
+    newer["困"] = {"character": "困", "decomposition": "⿴口才"}
+    patched, _, _ = radix_engine.update_component_map(patched, new, newer, max_depth=1, cycles=cycles,
+                                                      full_rebuild_share=1.0)
+    rebuilt, _ = radix_engine.build_component_map(newer, max_depth=1)
+    assert_same_map(patched, rebuilt)
+
+def test_compact_map_keeps_order():
+    component_map, _ = radix_engine.build_component_map(OLD, max_depth=1)
+    compact = radix_engine.CompactComponentMap(component_map, radix_engine.CharStore.from_entries(OLD))
+    assert_same_map(compact, component_map)
+
+def test_parallel_build_matches_serial(monkeypatch):
+    monkeypatch.setattr(radix_engine, "PARALLEL_MIN_CHARS", 0)
+    data = dict(OLD, **CYCLIC)
+    serial, serial_cycles = radix_engine.build_component_map(data, max_depth=2, workers=1)
+    parallel, parallel_cycles = radix_engine.build_component_map(data, max_depth=2, workers=2)
+    assert_same_map(parallel, serial)
+    assert parallel_cycles == serial_cycles
+
+def test_depth_view_matches_shallower_build():
+    deep, _ = radix_engine.build_component_map(OLD, max_depth=3)
+    shallow, _ = radix_engine.build_component_map(OLD, max_depth=0)
+    assert_same_map(radix_engine.DepthView(deep, 2), shallow)